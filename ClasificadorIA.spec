@@ -3,7 +3,7 @@ from PyInstaller.utils.hooks import collect_all
 
 datas = []
 binaries = []
-hiddenimports = ['webview', 'flask', 'engineio.async_drivers.threading']
+hiddenimports = ['webview', 'flask', 'engineio.async_drivers.threading', 'sqlite3', 'logging.handlers', 'cProfile', 'pstats', 'ctypes.util', 'select']
 tmp_ret = collect_all('torch')
 datas += tmp_ret[0]; binaries += tmp_ret[1]; hiddenimports += tmp_ret[2]
 tmp_ret = collect_all('torchvision')
@@ -12,7 +12,7 @@ tmp_ret = collect_all('torchvision')
 datas += tmp_ret[0]; binaries += tmp_ret[1]; hiddenimports += tmp_ret[2]
 
 # Add other hidden imports
-hiddenimports += ['webview', 'flask', 'engineio.async_drivers.threading']
+hiddenimports += ['webview', 'flask', 'engineio.async_drivers.threading', 'sqlite3', 'logging.handlers', 'cProfile', 'pstats', 'ctypes.util', 'select']
 
 # NOTE: UI and Logic are NOT included in the bundle
 # They will be loaded from external folders: ui/ and logic/
@@ -1,12 +1,33 @@
+import time
+STARTUP_STARTED = time.perf_counter()
+
 import os
 import sys
 import threading
-import webview
-from flask import Flask, render_template, jsonify, request, send_from_directory
+import multiprocessing
+from flask import Flask, render_template, jsonify, request, send_from_directory, send_file, Response, g
 from pathlib import Path
 from typing import List, Dict
 import importlib.util
-import time
+import json
+import logging
+import random
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import takewhile
+
+# Startup timing breakdown: (phase, seconds), logged once the model is ready
+startup_timings = []
+_startup_mark = STARTUP_STARTED
+
+def startup_phase(name: str):
+    """Records the time spent since the previous phase ended."""
+    global _startup_mark
+    now = time.perf_counter()
+    startup_timings.append((name, now - _startup_mark))
+    _startup_mark = now
+
+startup_phase("imports")
 
 # Configuration
 if getattr(sys, 'frozen', False):
@@ -37,6 +58,8 @@ else:
     UI_DIR = os.path.join(EXE_DIR, 'ui')
     LOGIC_DIR = os.path.join(EXE_DIR, 'logic')
     DATA_DIR = EXE_DIR
+# Points the app at another data folder (e.g. the benchmark suite's temp folder)
+DATA_DIR = os.environ.get("CLASIFICADOR_DATA_DIR", DATA_DIR)
 
 # Check for UI directory
 if not os.path.exists(UI_DIR):
@@ -50,56 +73,52 @@ if not os.path.exists(UI_DIR):
         # We continue, but Flask might fail if accessed.
 
 # Logging System
-log_buffer = []
-log_lock = threading.Lock()
+LOG_BUFFER_SIZE = 1000  # Keep last 1000 logs
+# Ring buffer of (sequence number, line); clients ask for lines after the last number they saw
+log_buffer = deque(maxlen=LOG_BUFFER_SIZE)
+log_seq = 0
+log_lock = threading.Condition()
 
-def add_log(message: str, level: str = "INFO"):
-    timestamp = time.strftime("%H:%M:%S")
+def add_log(message: str, level: str = "INFO", created: float = None):
+    global log_seq
+    timestamp = time.strftime("%H:%M:%S", time.localtime(created))
     with log_lock:
-        log_buffer.append(f"[{timestamp}] [{level}] {message}")
-        if len(log_buffer) > 1000:  # Keep last 1000 logs
-            log_buffer.pop(0)
-
-# Redirect stdout/stderr to capture prints
-class StreamLogger:
-    def __init__(self, original, level="INFO"):
-        self.original = original
-        self.level = level
-        # Flask messages to ignore (they're not real errors)
-        self.ignore_patterns = [
-            "WARNING: This is a development server",
-            "* Running on",
-            "Press CTRL+C to quit",
-            "GET /",
-            "POST /",
-            "\" 200 -",  # Successful requests
-            "\" 304 -",  # Not modified (cached)
-            "\" 404 -",  # Not found (favicon, etc.)
-            ".well-known",
-            "favicon.ico"
-        ]
-
-    def write(self, message):
-        self.original.write(message)
-        msg = message.strip()
-        
-        if not msg:
-            return
-            
-        # Filter out Flask's normal HTTP logs when coming from stderr
-        if self.level == "ERROR":
-            # Check if it's a Flask HTTP log or dev server message
-            should_ignore = any(pattern in msg for pattern in self.ignore_patterns)
-            if should_ignore:
-                return  # Don't log it
-        
-        add_log(msg, self.level)
+        log_seq += 1
+        log_buffer.append((log_seq, f"[{timestamp}] [{level}] {message}"))
+        log_lock.notify_all()
+
+def logs_since(cursor: int, timeout: float = 0):
+    """
+    Returns (lines after `cursor`, newest sequence number). If there are none yet,
+    waits up to `timeout` seconds for new ones.
+    """
+    with log_lock:
+        if log_seq <= cursor and timeout > 0:
+            log_lock.wait_for(lambda: log_seq > cursor, timeout=timeout)
+        # The buffer is ordered by sequence number: walk back from the newest end only
+        new = list(takewhile(lambda entry: entry[0] > cursor, reversed(log_buffer)))
+        new.reverse()
+        return new, log_seq
+
+# Helper modules imported by the managers (e.g. prediction_cache) live next to them
+if os.path.isdir(LOGIC_DIR) and LOGIC_DIR not in sys.path:
+    sys.path.insert(0, LOGIC_DIR)
+
+from log_pipeline import setup_logging
+from metrics import metrics, RequestProfiler
 
-    def flush(self):
-        self.original.flush()
+# Level per logger (module name). DEBUG lines of a module below its level are
+# discarded at the call site; werkzeug at INFO would log every HTTP request.
+LOG_LEVEL = "INFO"
+LOG_MODULE_LEVELS = {
+    "werkzeug": "WARNING",
+    "data_manager": "INFO",
+    "model_manager": "INFO",
+}
 
-sys.stdout = StreamLogger(sys.stdout, "INFO")
-sys.stderr = StreamLogger(sys.stderr, "ERROR")
+# Everything logged through `logging` ends up in log_buffer (and the console)
+log_listener = setup_logging(add_log, level=LOG_LEVEL, module_levels=LOG_MODULE_LEVELS)
+logger = logging.getLogger("app")
 
 # Dynamic Logic Loading
 def load_logic_module(module_name, file_name):
@@ -130,31 +149,230 @@ def load_logic_module(module_name, file_name):
 # Load Managers
 try:
     dm_module = load_logic_module('data_manager', 'data_manager')
-    mm_module = load_logic_module('model_manager', 'model_manager')
+    ts_module = load_logic_module('training_scheduler', 'training_scheduler')
+    thumb_module = load_logic_module('thumbnail_cache', 'thumbnail_cache')
+    jobs_module = load_logic_module('classification_jobs', 'classification_jobs')
     
     DataManager = dm_module.DataManager
-    ModelManager = mm_module.ModelManager
+    TrainingScheduler = ts_module.TrainingScheduler
+    ThumbnailCache = thumb_module.ThumbnailCache
+    ClassificationJobManager = jobs_module.ClassificationJobManager
 except Exception as e:
     add_log(f"Fatal error loading managers: {e}", "CRITICAL")
     sys.exit(1)
 
+# Images per forward pass when classifying the entrada queue
+PREDICT_BATCH_SIZE = 32
+# /api/images page size when the client doesn't send ?limit= (and its maximum)
+IMAGES_PAGE_SIZE = 100
+IMAGES_MAX_PAGE_SIZE = 500
+# Previews served by /thumbnails/entrada/<file> (index/thumbnails/): longest side in px, "JPEG" or "WEBP"
+THUMBNAIL_SIZE = 256
+THUMBNAIL_FORMAT = "JPEG"
+# Background classification jobs (/api/jobs): jobs run at the same time, images per step
+CLASSIFY_JOB_WORKERS = 1
+CLASSIFY_JOB_CHUNK = PREDICT_BATCH_SIZE
+# Content hash used for the dataset index and caches: "md5", "blake2b" or "sha256".
+# Changing it on an existing dataset means old index entries keep their old hashes.
+HASH_ALGORITHM = "md5"
+# Max perceptual-hash distance (0-64 bits) to drop near-duplicate uploads; None = exact only
+PERCEPTUAL_DEDUP_DISTANCE = None
+# Files hashed and moved at the same time when accepting a batch (I/O bound, so
+# more threads than cores helps, especially with data on a network share)
+PROCESS_BATCH_WORKERS = 8
+# Where accepted images are stored: "flat" (clasificaciones/<label>/<file>) or
+# "sharded" (clasificaciones/<label>/ab/cd/<hash>.jpg, for very large datasets).
+# Existing images are moved with: python -m clasificador migrate-layout sharded
+# In the sharded layout clasificaciones counts come only from the counters kept
+# in the index: code that moves files out of those folders must report it
+# (SubclassifierManager does when given the DataManager); otherwise run
+# POST /api/stats/reconcile or `python -m clasificador stats --reconcile`.
+DATASET_LAYOUT = "flat"
+# entrada/ and the dataset folders are listed once at startup and then kept in
+# memory by a watcher ("auto": inotify on Linux, otherwise polling). When polling
+# (Windows), entrada/ is re-listed every WATCHER_POLL_SECONDS and the dataset
+# folders, which can hold hundreds of thousands of files and are updated by the
+# app itself on accept, only every WATCHER_DATASET_POLL_SECONDS. Images that land
+# in entrada/ are classified right away in the background, so their predictions
+# are cached before the UI asks.
+WATCH_FOLDERS = True
+WATCHER_BACKEND = "auto"
+WATCHER_POLL_SECONDS = 2.0
+WATCHER_DATASET_POLL_SECONDS = 300
+PRECLASSIFY_NEW_IMAGES = True
+# Background training: start once this many samples are pending, or this many seconds
+# after the first pending accept, and never more often than TRAIN_MIN_INTERVAL seconds
+TRAIN_MIN_SAMPLES = 50
+TRAIN_DEBOUNCE_SECONDS = 30
+TRAIN_MIN_INTERVAL = 60
+# "incremental": new samples since the last checkpoint + a replay sample per class
+# "full": retrain over the whole dataset every time (also available via POST /api/training)
+TRAIN_MODE = "incremental"
+TRAIN_MAX_NEW_SAMPLES = 512
+TRAIN_REPLAY_PER_CLASS = 256
+# Freeze the ResNet backbone, cache its embeddings per image hash (index/features/)
+# and train only the final layer: retraining takes milliseconds instead of minutes
+HEAD_ONLY_TRAINING = False
+# Keep resized 224x224 copies of training images (index/tensors/) so each image is
+# decoded once instead of once per epoch
+TRAIN_TENSOR_CACHE = True
+# DataLoader worker processes for full training. Workers re-import this module on
+# Windows (spawn), so 0 (decode in the training thread) is the safe default there.
+TRAIN_LOADER_WORKERS = 0
+TRAIN_LOADER_PREFETCH = 2
+# How predictions run on CPU: "eager", "channels_last", "torchscript", "compile",
+# "int8_dynamic", "int8_static" or "onnxruntime" (needs onnxruntime installed).
+# Compare them with benchmarks/bench_inference.py; anything that fails or disagrees
+# with eager on the calibration images falls back to eager.
+INFERENCE_BACKEND = "eager"
+INFERENCE_CALIBRATION_IMAGES = 64
+# CPU budget. Predictions run one batch at a time on a dedicated inference thread
+# with INFERENCE_THREADS torch threads, and training uses TRAIN_THREADS, so
+# background training doesn't stall /api/images. With the OpenMP backend of the
+# standard torch builds each thread keeps its own count; builds with a
+# process-wide pool (TBB/native) share one, and the two alternate while they
+# overlap. torch otherwise uses every core in every thread, oversubscribing the CPU.
+CPU_CORES = os.cpu_count() or 1
+INFERENCE_THREADS = max(1, CPU_CORES // 2)
+TRAIN_THREADS = max(1, CPU_CORES - INFERENCE_THREADS)
+TORCH_INTEROP_THREADS = 1
+# Timings are always collected and served by /api/metrics (Prometheus format).
+# With PROFILE_REQUESTS on, adding ?profile=1 to any URL runs that request under
+# cProfile and writes logs/profiles/<time>_<path>.prof (pstats/snakeviz).
+PROFILE_REQUESTS = False
+# Long-lived SSE responses would only add noise to the request time histogram
+UNTIMED_ENDPOINTS = {"stream_logs", "stream_classification_job"}
+
 # Initialize Flask
 app = Flask(__name__, static_folder=UI_DIR, template_folder=UI_DIR)
+request_profiler = RequestProfiler(os.path.join(DATA_DIR, "logs", "profiles"))
+
+@app.before_request
+def start_request_timing():
+    g.request_started = time.perf_counter()
+    if PROFILE_REQUESTS and request.args.get('profile') == '1':
+        g.profiler = request_profiler.start()
+        if g.profiler is None:
+            add_log("Ya hay una petición en perfilado; esta se ejecuta sin perfilar", "WARNING")
+
+@app.after_request
+def record_request_timing(response):
+    if request.endpoint not in UNTIMED_ENDPOINTS:
+        metrics.observe("request_seconds", time.perf_counter() - g.request_started,
+                        endpoint=request.endpoint or "not_found", method=request.method)
+    return response
+
+@app.teardown_request
+def stop_request_profiler(exc):
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        request_profiler.stop(profiler, request.path)
 
 # Managers Initialization
-print(f"DEBUG: Initializing managers with DATA_DIR: {DATA_DIR}")
-dm = DataManager(DATA_DIR)
-mm = ModelManager(os.path.join(DATA_DIR, "modelo", "modelo_actual.pth"))
+logger.debug("Initializing managers with DATA_DIR: %s", DATA_DIR)
+dm = DataManager(DATA_DIR, hash_algorithm=HASH_ALGORITHM, perceptual_threshold=PERCEPTUAL_DEDUP_DISTANCE,
+                 io_workers=PROCESS_BATCH_WORKERS, layout=DATASET_LAYOUT)
+thumbnails = ThumbnailCache(os.path.join(DATA_DIR, "index", "thumbnails"),
+                            size=THUMBNAIL_SIZE, image_format=THUMBNAIL_FORMAT)
+startup_phase("data manager")
 
-# Check dataset on startup
-try:
-    stats = dm.get_detailed_stats()
-    if not stats["dataset_base_exists"]:
-        add_log("Dataset base no encontrado. Crear carpeta o cargar imágenes.", "WARNING")
-    else:
-        add_log(f"Dataset base encontrado. Imágenes aprendidas: {stats['total_learned']}", "INFO")
-except Exception as e:
-    add_log(f"Error checking stats: {e}", "ERROR")
+# The model (torch import, ResNet construction, weights) is loaded by a background
+# warm-up so the window opens right away. Until then mm is None and model_state
+# is "loading"; code that needs the model calls wait_for_model().
+mm = None
+model_state = {"state": "loading", "error": None}
+model_ready = threading.Event()
+
+def wait_for_model(timeout: float = None):
+    """Blocks until the warm-up finishes and returns the ModelManager."""
+    if not model_ready.wait(timeout):
+        raise TimeoutError("El modelo todavía se está cargando")
+    if mm is None:
+        raise RuntimeError(f"El modelo no pudo cargarse: {model_state['error']}")
+    return mm
+
+preclassify_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="preclassify")
+
+def preclassify(files: List[str]):
+    """Background classification of new entrada files (fills the prediction cache)."""
+    try:
+        present = [f for f in files if os.path.exists(os.path.join(dm.paths["entrada"], f))]
+        if present:
+            classify_entrada(present)
+            logger.debug("Pre-classified %d new images", len(present))
+    except Exception as e:
+        logger.warning("Pre-classification failed: %s", e)
+
+def on_folder_change(folder: str, names: List[str]):
+    if folder == "entrada" and PRECLASSIFY_NEW_IMAGES:
+        preclassify_pool.submit(preclassify, names)
+
+def warm_up():
+    global mm
+    if WATCH_FOLDERS:
+        try:
+            dm.start_watcher(on_change=on_folder_change, backend=WATCHER_BACKEND, poll_interval=WATCHER_POLL_SECONDS,
+                             dataset_poll_interval=WATCHER_DATASET_POLL_SECONDS)
+            # The listing is already in memory: refresh the persisted counters for free
+            dm.reconcile_counters()
+            startup_phase("folder listing")
+        except Exception as e:
+            add_log(f"No se pudo vigilar las carpetas ({e}); se listarán en cada petición", "WARNING")
+    try:
+        mm_module = load_logic_module('model_manager', 'model_manager')
+        startup_phase("torch + model_manager import")
+
+        calibration_files = []
+        if INFERENCE_BACKEND != "eager":
+            data = dm.get_dataset_files()
+            pool = data["ia"] + data["real"]
+            calibration_files = random.sample(pool, min(INFERENCE_CALIBRATION_IMAGES, len(pool)))
+
+        mm = mm_module.ModelManager(
+            os.path.join(DATA_DIR, "modelo", "modelo_actual.pth"),
+            cache_path=os.path.join(DATA_DIR, "index", "prediction_cache.db"),
+            feature_cache_dir=os.path.join(DATA_DIR, "index", "features") if HEAD_ONLY_TRAINING else None,
+            hash_fn=dm.get_file_hash,
+            tensor_cache_dir=os.path.join(DATA_DIR, "index", "tensors") if TRAIN_TENSOR_CACHE else None,
+            loader_workers=TRAIN_LOADER_WORKERS,
+            loader_prefetch=TRAIN_LOADER_PREFETCH,
+            inference_backend=INFERENCE_BACKEND,
+            calibration_files=calibration_files,
+            inference_threads=INFERENCE_THREADS,
+            train_threads=TRAIN_THREADS,
+            interop_threads=TORCH_INTEROP_THREADS
+        )
+        startup_phase("model construction + weights")
+        model_state["state"] = "ready"
+    except Exception as e:
+        logger.exception("Model warm-up failed: %s", e)
+        add_log(f"Error cargando el modelo: {e}", "CRITICAL")
+        model_state.update(state="error", error=str(e))
+    finally:
+        model_ready.set()
+
+    # Check dataset on startup (walks the dataset folders, so it runs here too)
+    try:
+        stats = dm.get_detailed_stats()
+        if not stats["dataset_base_exists"]:
+            add_log("Dataset base no encontrado. Crear carpeta o cargar imágenes.", "WARNING")
+        else:
+            add_log(f"Dataset base encontrado. Imágenes aprendidas: {stats['total_learned']}", "INFO")
+    except Exception as e:
+        add_log(f"Error checking stats: {e}", "ERROR")
+    startup_phase("dataset stats")
+
+    # Hashes every queued entrada file once, after the model is ready so it
+    # doesn't delay it; files that arrive later are checked by the watcher
+    try:
+        dm.check_entrada()
+    except Exception as e:
+        logger.warning("Entrada duplicate check failed: %s", e)
+    startup_phase("entrada duplicate check")
+
+    logger.info("Startup timing: %s (total %.2f s)",
+                ", ".join(f"{name} {seconds:.2f} s" for name, seconds in startup_timings),
+                time.perf_counter() - STARTUP_STARTED)
 
 @app.route('/')
 def index():
@@ -168,29 +386,176 @@ def serve_static(filename):
 def serve_image(filename):
     return send_from_directory(dm.paths["entrada"], filename)
 
+@app.route('/thumbnails/entrada/<path:filename>')
+def serve_thumbnail(filename):
+    path = os.path.join(dm.paths["entrada"], filename)
+    # Same checks send_from_directory does for the full image
+    if os.path.basename(filename) != filename or not os.path.isfile(path):
+        return jsonify({"error": "File not found"}), 404
+    try:
+        file_hash = dm.get_file_hash(path)
+        thumb_path = thumbnails.get(path, file_hash)
+    except Exception as e:
+        add_log(f"Error generando miniatura de {filename}: {e}", "ERROR")
+        return send_from_directory(dm.paths["entrada"], filename)
+
+    # The thumbnail only changes with the content, so the hash is a valid ETag. Browsers
+    # revalidate every time (a new upload may reuse the filename) and usually get a 304.
+    return send_file(thumb_path, mimetype=thumbnails.mimetype, max_age=0, etag=file_hash)
+
+def classify_entrada(files: List[str]) -> List[Dict]:
+    """Predictions for the given entrada files, as returned by /api/images."""
+    paths = [os.path.join(dm.paths["entrada"], f) for f in files]
+    # Content hashes let unchanged files reuse their cached prediction
+    hashes = []
+    for p in paths:
+        try:
+            hashes.append(dm.get_file_hash(p))
+        except OSError:
+            hashes.append(None)  # Removed since it was listed
+    readable = [i for i, h in enumerate(hashes) if h is not None]
+    predictions = [{"label": "error", "confidence": 0.0} for _ in paths]
+    # Jobs started while the model loads simply wait here
+    batch = wait_for_model().predict_batch([paths[i] for i in readable], batch_size=PREDICT_BATCH_SIZE,
+                             hashes=[hashes[i] for i in readable])
+    for i, prediction in zip(readable, batch):
+        predictions[i] = prediction
+
+    results = []
+    for f, prediction in zip(files, predictions):
+        if prediction["label"] == "error":
+            add_log(f"Error clasificando {f}", "ERROR")
+
+        results.append({
+            "filename": f,
+            "prediction": prediction,
+            "url": f"/images/entrada/{f}",
+            "thumbnail": f"/thumbnails/entrada/{f}"
+        })
+    return results
+
 @app.route('/api/images', methods=['GET'])
 def get_images():
+    """
+    Without parameters: every image in entrada with its prediction (list).
+    With ?limit=, ?cursor=, ?sort=name|mtime|size or ?order=asc|desc: one page,
+    {"items", "next_cursor", "total", "duplicates"}; only the images of that page
+    are classified. Duplicates of known images are left out (see /api/duplicates).
+    """
+    paged = any(arg in request.args for arg in ('limit', 'cursor', 'sort', 'order'))
+    if not model_ready.is_set():
+        return jsonify({"error": "Modelo cargando", "model_state": model_state["state"]}), 503
     try:
-        files = dm.scan_entrada()
-        results = []
-        for f in files:
-            full_path = os.path.join(dm.paths["entrada"], f)
-            try:
-                prediction = mm.predict(full_path)
-            except Exception as e:
-                add_log(f"Error clasificando {f}: {e}", "ERROR")
-                prediction = "Error"
-            
-            results.append({
-                "filename": f,
-                "prediction": prediction,
-                "url": f"/images/entrada/{f}"
-            })
-        return jsonify(results)
+        if not paged:
+            return jsonify(classify_entrada(dm.scan_entrada()))
+
+        limit = min(max(request.args.get('limit', IMAGES_PAGE_SIZE, type=int), 1), IMAGES_MAX_PAGE_SIZE)
+        page = dm.entrada_page(
+            sort=request.args.get('sort', 'name'),
+            descending=request.args.get('order', 'asc') == 'desc',
+            cursor=request.args.get('cursor') or None,
+            limit=limit
+        )
+        return jsonify({
+            "items": classify_entrada(page["files"]),
+            "next_cursor": page["next_cursor"],
+            "total": page["total"],
+            # Left out of the queue; listed and removable through /api/duplicates
+            "duplicates": dm.entrada_duplicate_count()
+        })
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         add_log(f"Error escaneando entrada: {e}", "ERROR")
         return jsonify({"error": str(e)}), 500
 
+classification_jobs = ClassificationJobManager(
+    classify_entrada, max_workers=CLASSIFY_JOB_WORKERS, chunk_size=CLASSIFY_JOB_CHUNK
+)
+
+@app.route('/api/jobs/classify', methods=['POST'])
+def start_classification_job():
+    """
+    Starts classifying entrada in the background and returns {"job_id", "total", ...}
+    right away. Body (all optional): {"files": [...]} to classify specific files, or
+    the /api/images page parameters {"limit", "cursor", "sort", "order"}; with none
+    of them the whole queue is classified.
+    """
+    data = request.get_json(silent=True) or {}
+    page = {"next_cursor": None}
+    try:
+        if data.get('files') is not None:
+            files = [f for f in data['files'] if os.path.basename(f) == f]
+        elif any(key in data for key in ('limit', 'cursor', 'sort', 'order')):
+            page = dm.entrada_page(
+                sort=data.get('sort', 'name'),
+                descending=data.get('order', 'asc') == 'desc',
+                cursor=data.get('cursor') or None,
+                limit=min(max(int(data.get('limit', IMAGES_PAGE_SIZE)), 1), IMAGES_MAX_PAGE_SIZE)
+            )
+            files = page["files"]
+        else:
+            files = dm.scan_entrada()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    job = classification_jobs.start(files)
+    status = job.status()
+    status["next_cursor"] = page["next_cursor"]
+    status["queue_total"] = page.get("total", len(files))
+    return jsonify(status), 202
+
+def get_job_or_404(job_id):
+    job = classification_jobs.get(job_id)
+    if job is None:
+        return None, (jsonify({"error": "Job not found"}), 404)
+    return job, None
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_classification_job(job_id):
+    """Job status plus the results after position ?since= (long-polls up to ?wait= seconds)."""
+    job, error = get_job_or_404(job_id)
+    if error:
+        return error
+    since = request.args.get('since', 0, type=int)
+    wait = min(max(request.args.get('wait', 0, type=float), 0), 30)
+    results, position = job.results_since(since, timeout=wait)
+    status = job.status()
+    status.update(results=results, next=position)
+    return jsonify(status)
+
+@app.route('/api/jobs/<job_id>/stream', methods=['GET'])
+def stream_classification_job(job_id):
+    """Server-sent events: one 'data' event per result, then an 'end' event with the final status."""
+    job, error = get_job_or_404(job_id)
+    if error:
+        return error
+    position = request.headers.get('Last-Event-ID', type=int) or request.args.get('since', 0, type=int)
+
+    def generate():
+        nonlocal position
+        while True:
+            results, new_position = job.results_since(position, timeout=15)
+            if results:
+                yield "".join(f"id: {position + i + 1}\ndata: {json.dumps(r)}\n\n" for i, r in enumerate(results))
+                position = new_position
+            elif job.finished_state:
+                yield f"event: end\ndata: {json.dumps(job.status())}\n\n"
+                return
+            else:
+                yield ": keep-alive\n\n"
+
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_classification_job(job_id):
+    job, error = get_job_or_404(job_id)
+    if error:
+        return error
+    job.cancel()
+    return jsonify(job.status())
+
 @app.route('/api/upload', methods=['POST'])
 def upload_files():
     if 'files[]' not in request.files:
@@ -198,14 +563,20 @@ def upload_files():
     
     files = request.files.getlist('files[]')
     saved_files = []
+    duplicates = []
     errors = []
+    # Shared across the request so repeats within the same upload are caught too
+    entrada_hashes = dm.get_entrada_hashes()
     
     for file in files:
         if file.filename:
             try:
-                path = dm.save_upload(file, file.filename)
+                path = dm.save_upload(file, file.filename, entrada_hashes=entrada_hashes)
                 saved_files.append(file.filename)
                 add_log(f"Imagen cargada: {file.filename}", "INFO")
+            except dm_module.DuplicateImageError as e:
+                duplicates.append({"filename": e.filename, "reason": e.reason, "match": e.match})
+                add_log(f"Imagen duplicada descartada: {e.filename} ({e.reason})", "INFO")
             except Exception as e:
                 error_msg = f"Error cargando {file.filename}: {e}"
                 errors.append(error_msg)
@@ -214,6 +585,7 @@ def upload_files():
     return jsonify({
         "message": f"Uploaded {len(saved_files)} files", 
         "files": saved_files,
+        "duplicates": duplicates,
         "errors": errors
     })
 
@@ -228,24 +600,110 @@ def accept_classification():
     # Process batch (move, index, log)
     try:
         stats = dm.process_batch(items)
-        add_log(f"Procesado lote: {stats}", "INFO")
+        add_log(f"Procesado lote: {stats['real']} real, {stats['ia']} ia, {stats['errors']} errores", "INFO")
+        for item in stats["items"]:
+            if item["status"] == "error":
+                add_log(f"No se pudo procesar {item['filename']}: {item['error']}", "ERROR")
         
-        # Trigger training in background
-        threading.Thread(target=run_training).start()
+        # Queue training in background (coalesced with other pending accepts)
+        training_scheduler.notify(stats["real"] + stats["ia"])
         
         return jsonify({"status": "success", "stats": stats})
     except Exception as e:
         add_log(f"Error procesando lote: {e}", "ERROR")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/status', methods=['GET'])
+def get_status():
+    """Model warm-up state ('loading', 'ready' or 'error') and the startup timing breakdown."""
+    return jsonify({
+        "model_state": model_state["state"],
+        "model_error": model_state["error"],
+        "startup": [{"phase": name, "seconds": round(seconds, 3)} for name, seconds in startup_timings],
+    })
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Counters and timing histograms in the Prometheus text format."""
+    metrics.set("model_ready", 1 if model_state["state"] == "ready" else 0)
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
 @app.route('/api/stats', methods=['GET'])
 def get_stats():
     return jsonify(dm.get_detailed_stats())
 
+@app.route('/api/stats/reconcile', methods=['POST'])
+def reconcile_stats():
+    """Recounts the dataset folders (after files were copied or deleted outside the app)."""
+    counts = dm.reconcile_counters()
+    add_log(f"Contadores del dataset recalculados: {counts}", "INFO")
+    return jsonify(dm.get_detailed_stats())
+
+@app.route('/api/training', methods=['GET'])
+def get_training_status():
+    return jsonify(training_scheduler.status())
+
+@app.route('/api/training', methods=['POST'])
+def start_training():
+    """Requests a training run without waiting for the debounce. {"full": true} retrains on everything"""
+    data = request.get_json(silent=True) or {}
+    full_retrain = bool(data.get('full', False))
+    training_scheduler.run_now(full_retrain=full_retrain)
+    add_log(f"Entrenamiento solicitado manualmente ({'completo' if full_retrain else 'incremental'})", "INFO")
+    return jsonify(training_scheduler.status())
+
 @app.route('/api/logs', methods=['GET'])
 def get_logs():
-    with log_lock:
-        return jsonify(log_buffer)
+    """
+    Without parameters: every buffered line (list of strings).
+    ?since=<cursor>[&wait=<seconds>]: long-poll, returns {"cursor", "lines"} with only
+    the lines after `cursor`, waiting up to `wait` seconds (max 30) if there are none.
+    """
+    if 'since' not in request.args:
+        with log_lock:
+            return jsonify([line for _, line in log_buffer])
+
+    cursor = request.args.get('since', 0, type=int)
+    wait = min(max(request.args.get('wait', 0, type=float), 0), 30)
+    entries, latest = logs_since(cursor, timeout=wait)
+    return jsonify({"cursor": latest, "lines": [line for _, line in entries]})
+
+@app.route('/api/logs/stream', methods=['GET'])
+def stream_logs():
+    """Server-sent events: one 'data' event per log line, id = sequence number."""
+    # EventSource sends Last-Event-ID when it reconnects
+    cursor = request.headers.get('Last-Event-ID', type=int)
+    if cursor is None:
+        cursor = request.args.get('since', 0, type=int)
+
+    def generate():
+        nonlocal cursor
+        while True:
+            entries, latest = logs_since(cursor, timeout=15)
+            if not entries:
+                # Comment line keeps the connection alive and detects closed clients
+                yield ": keep-alive\n\n"
+                continue
+            cursor = latest
+            yield "".join(f"id: {seq}\ndata: {json.dumps(line)}\n\n" for seq, line in entries)
+
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/duplicates', methods=['GET'])
+def get_duplicates():
+    """Entrada images hidden from /api/images because their content is already known."""
+    return jsonify(dm.entrada_duplicates())
+
+@app.route('/api/duplicates/remove', methods=['POST'])
+def remove_duplicates():
+    """Deletes the duplicates listed by /api/duplicates (body {"files": [...]} to pick some)."""
+    data = request.get_json(silent=True) or {}
+    result = dm.remove_entrada_duplicates(data.get('files'))
+    add_log(f"Duplicados eliminados de entrada: {len(result['removed'])}", "INFO")
+    for error in result["errors"]:
+        add_log(f"Error eliminando duplicado {error['filename']}: {error['error']}", "ERROR")
+    return jsonify(result)
 
 @app.route('/api/remove', methods=['POST'])
 def remove_image():
@@ -262,7 +720,7 @@ def remove_image():
         if not os.path.exists(image_path):
             return jsonify({"error": "File not found"}), 404
         
-        os.remove(image_path)
+        dm.remove_entrada_file(filename)
         add_log(f"Imagen eliminada: {filename}", "INFO")
         
         return jsonify({"status": "success", "message": f"Deleted {filename}"})
@@ -271,20 +729,46 @@ def remove_image():
         return jsonify({"error": str(e)}), 500
 
 
-def run_training():
-    print("Starting background training...")
-    try:
-        data = dm.get_dataset_files()
-        metrics = mm.train(data, epochs=1)
-        print(f"Training finished: {metrics}")
-    except Exception as e:
-        print(f"Training failed: {e}")
+def run_training(progress_callback=None, full_retrain=False):
+    manager = wait_for_model()
+    logger.info("Starting background training...")
+    started = time.time()
+    data = dm.get_dataset_files()
+
+    if full_retrain or TRAIN_MODE == "full":
+        new_files, trained_until = None, started
+    else:
+        new_files, trained_until = dm.get_new_samples(manager.trained_until, limit=TRAIN_MAX_NEW_SAMPLES)
+
+    metrics = manager.train(
+        data, epochs=1, progress_callback=progress_callback,
+        new_files=new_files, replay_per_class=TRAIN_REPLAY_PER_CLASS, trained_until=trained_until
+    )
+    logger.info("Training finished: %s", metrics)
+    if new_files is not None and dm.has_new_samples(manager.trained_until):
+        # The window was capped at TRAIN_MAX_NEW_SAMPLES: drain the rest without waiting for an accept
+        training_scheduler.run_now()
+    return metrics
+
+# Single worker for all training runs; errors are logged and kept in its status
+training_scheduler = TrainingScheduler(
+    run_training,
+    min_samples=TRAIN_MIN_SAMPLES,
+    debounce_seconds=TRAIN_DEBOUNCE_SECONDS,
+    min_interval=TRAIN_MIN_INTERVAL
+)
+
+threading.Thread(target=warm_up, name="model-warm-up", daemon=True).start()
 
 def start_server():
     # Disable reloader to avoid issues in thread
     app.run(host='127.0.0.1', port=5000, threaded=True, use_reloader=False)
 
 if __name__ == '__main__':
+    # Needed by DataLoader workers in the frozen (PyInstaller) build
+    multiprocessing.freeze_support()
+    import webview
+
     # Start Flask in a separate thread
     t = threading.Thread(target=start_server)
     t.daemon = True
@@ -0,0 +1,78 @@
+"""
+Benchmark: file hashing in DataManager.
+
+Compares the old whole-file read (f.read() + MD5) against FileHasher with
+chunked MD5 / BLAKE2b, and the stat-keyed cache on a second pass.
+Reports throughput (MB/s) and peak Python memory (tracemalloc).
+
+Usage:
+    python benchmarks/bench_hashing.py --files 20 --size-mb 8
+"""
+import argparse
+import hashlib
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "logic"))
+
+from file_hasher import FileHasher
+
+
+def make_dataset(folder: Path, count: int, size_mb: float):
+    """Writes `count` incompressible files of ~size_mb with an image extension."""
+    size = int(size_mb * 1024 * 1024)
+    for i in range(count):
+        with open(folder / f"img_{i:04d}.png", "wb") as f:
+            f.write(os.urandom(size))
+
+
+def legacy_hash(path: Path) -> str:
+    # The implementation DataManager.get_file_hash used before FileHasher
+    hasher = hashlib.md5()
+    with open(path, "rb") as f:
+        buf = f.read()
+        hasher.update(buf)
+    return hasher.hexdigest()
+
+
+def measure(name: str, fn, files, total_bytes: int):
+    tracemalloc.start()
+    start = time.perf_counter()
+    for path in files:
+        fn(path)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    throughput = total_bytes / (1024 * 1024) / elapsed if elapsed > 0 else float("inf")
+    print(f"{name:<28} {elapsed:8.3f} s  {throughput:10.1f} MB/s  peak {peak / (1024 * 1024):8.2f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=20)
+    parser.add_argument("--size-mb", type=float, default=8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = Path(tmp)
+        make_dataset(folder, args.files, args.size_mb)
+        files = sorted(folder.iterdir())
+        total_bytes = sum(f.stat().st_size for f in files)
+        print(f"{len(files)} files, {total_bytes / (1024 * 1024):.1f} MB total\n")
+
+        measure("legacy md5 (f.read)", legacy_hash, files, total_bytes)
+        measure("chunked md5", FileHasher("md5").hash_file, files, total_bytes)
+        measure("chunked blake2b", FileHasher("blake2b").hash_file, files, total_bytes)
+
+        cached = FileHasher("md5")
+        measure("cached md5 (first pass)", cached.hash, files, total_bytes)
+        measure("cached md5 (unchanged)", cached.hash, files, total_bytes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Benchmark: CPU inference backends (see logic/inference_backends.py).
+
+Runs every backend over a held-out folder with `ia/` and `real/` subfolders and
+reports accuracy, agreement with eager, single-image latency (p50/p95) and batch
+throughput. Backends that are unavailable or fail validation are reported as such.
+
+Usage:
+    python benchmarks/bench_inference.py --folder holdout --model modelo/modelo_actual.pth
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "logic"))
+
+import numpy as np
+import torch
+
+from inference_backends import BACKENDS, InferenceBackend, create_backend
+from model_manager import ModelManager
+
+VALID_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+
+
+def load_holdout(folder: Path, limit: int):
+    """(paths, labels) with 0 = ia, 1 = real, at most `limit` per class."""
+    paths, labels = [], []
+    for label, name in ((0, "ia"), (1, "real")):
+        files = sorted(f for f in (folder / name).iterdir() if f.suffix.lower() in VALID_EXTENSIONS)[:limit]
+        paths += [str(f) for f in files]
+        labels += [label] * len(files)
+    return paths, labels
+
+
+def measure(backend: InferenceBackend, images: torch.Tensor, batch_size: int, latency_runs: int):
+    # Warm-up (lazy initialization, compilation caches)
+    backend(images[:1])
+    backend(images[:batch_size])
+
+    latencies = []
+    for i in range(min(latency_runs, len(images))):
+        start = time.perf_counter()
+        backend(images[i:i + 1])
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    outputs = []
+    start = time.perf_counter()
+    for s in range(0, len(images), batch_size):
+        outputs.append(backend(images[s:s + batch_size]).float().cpu())
+    elapsed = time.perf_counter() - start
+    return torch.cat(outputs), np.percentile(latencies, 50), np.percentile(latencies, 95), len(images) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--folder", required=True, help="Held-out images in ia/ and real/")
+    parser.add_argument("--model", default="modelo/modelo_actual.pth")
+    parser.add_argument("--backends", default=",".join(BACKENDS), help="Comma separated")
+    parser.add_argument("--per-class", type=int, default=200, help="Max images per class")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--latency-runs", type=int, default=50)
+    args = parser.parse_args()
+
+    paths, labels = load_holdout(Path(args.folder), args.per_class)
+    mm = ModelManager(args.model)
+    # Decoded once; every backend sees exactly the same tensors
+    images = torch.stack([mm._load_tensor(p) for p in paths])
+    targets = torch.tensor(labels)
+    calibration = images[torch.randperm(len(images))[:64]]
+    print(f"{len(paths)} images ({labels.count(0)} ia, {labels.count(1)} real), "
+          f"torch {torch.__version__}, {torch.get_num_threads()} threads\n")
+
+    eager = InferenceBackend(mm.model, mm.device)
+    reference = torch.cat([eager(images[s:s + args.batch_size])
+                           for s in range(0, len(images), args.batch_size)]).argmax(1)
+
+    print(f"{'backend':<14} {'accuracy':>9} {'agree':>7} {'p50 ms':>8} {'p95 ms':>8} {'img/s':>8}")
+    for name in args.backends.split(","):
+        backend = create_backend(name, mm.model, mm.device, calibration,
+                                 onnx_path=str(Path(args.model).with_suffix(".bench.onnx")))
+        if backend.name != name:
+            print(f"{name:<14} unavailable or failed validation (see log)")
+            continue
+
+        outputs, p50, p95, throughput = measure(backend, images, args.batch_size, args.latency_runs)
+        predicted = outputs.argmax(1)
+        accuracy = (predicted == targets).float().mean().item() * 100
+        agreement = (predicted == reference).float().mean().item() * 100
+        print(f"{name:<14} {accuracy:8.2f}% {agreement:6.1f}% {p50:8.2f} {p95:8.2f} {throughput:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
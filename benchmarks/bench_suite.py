@@ -0,0 +1,241 @@
+"""
+Benchmark suite: classification, training and data management on synthetic data.
+
+Generates random-noise JPEG datasets (deterministic for a given --seed) in a
+temporary folder and measures:
+
+  predict       ModelManager.predict latency (p50/p95) and predict_batch throughput
+  train         ModelManager.train images/s (full training, --epochs)
+  data          DataManager.scan_entrada and process_batch time vs. index size
+  api           /api/images end-to-end time through the Flask test client
+                (cold: no cached predictions, warm: second request)
+
+Results are printed and written to --out as JSON, with the commit, torch version
+and CPU count, so runs on different commits can be compared.
+
+Usage:
+    python benchmarks/bench_suite.py --out bench_results.json
+    python benchmarks/bench_suite.py --only data --index-sizes 0,10000,100000
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT_DIR, "logic"))
+sys.path.append(ROOT_DIR)  # app.py, after logic/ so the root copies of the managers aren't used
+
+import numpy as np
+from PIL import Image
+
+from data_manager import DataManager
+
+BENCHMARKS = ("predict", "train", "data", "api")
+
+
+def make_images(folder: Path, count: int, size, rng: np.random.Generator, prefix: str = "img"):
+    """Writes `count` random JPEGs of `size` (width, height) and returns their paths."""
+    folder.mkdir(parents=True, exist_ok=True)
+    width, height = size
+    paths = []
+    for i in range(count):
+        pixels = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+        path = folder / f"{prefix}_{i:06d}.jpg"
+        Image.fromarray(pixels).save(path, quality=90)
+        paths.append(str(path))
+    return paths
+
+
+def fill_index(dm: DataManager, size: int, rng: np.random.Generator, chunk: int = 10000):
+    """Adds `size` fake entries to the index (their files don't exist; lookups are by hash)."""
+    for start in range(0, size, chunk):
+        entries = {}
+        for i in range(start, min(start + chunk, size)):
+            file_hash = rng.bytes(16).hex()
+            label = "ia" if i % 2 else "real"
+            entries[file_hash] = {"path": f"synthetic/{label}/{i}.jpg", "label": label,
+                                  "origin": "clasificaciones", "timestamp": time.time(), "hash": file_hash}
+        dm.index.put_many(entries)
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def percentiles_ms(seconds):
+    ms = np.array(seconds) * 1000
+    return {"p50_ms": float(np.percentile(ms, 50)), "p95_ms": float(np.percentile(ms, 95)),
+            "mean_ms": float(ms.mean())}
+
+
+def open_model(dm: DataManager, **options):
+    # torch is imported only by the benchmarks that need it
+    from model_manager import ModelManager
+
+    model_dir = dm.base_path / "modelo"
+    model_dir.mkdir(exist_ok=True)
+    return ModelManager(str(model_dir / "modelo_actual.pth"), hash_fn=dm.get_file_hash, **options)
+
+
+def bench_predict(workdir: Path, args, rng):
+    dm = DataManager(str(workdir / "predict"))
+    files = make_images(dm.paths["entrada"], args.images, args.image_size, rng)
+    mm = open_model(dm)
+
+    mm.predict(files[0])  # Warm-up
+    latencies = [timed(mm.predict, f)[0] for f in files[:args.latency_runs]]
+
+    mm.predict_batch(files[:args.batch_size], batch_size=args.batch_size)
+    elapsed, _ = timed(mm.predict_batch, files, batch_size=args.batch_size, num_workers=args.workers)
+    return {**percentiles_ms(latencies), "latency_runs": len(latencies), "batch_size": args.batch_size,
+            "batch_images": len(files), "batch_images_per_sec": len(files) / elapsed}
+
+
+def bench_train(workdir: Path, args, rng):
+    dm = DataManager(str(workdir / "train"))
+    per_class = args.images // 2
+    make_images(dm.paths["dataset_base_ia"], per_class, args.image_size, rng)
+    make_images(dm.paths["dataset_base_real"], per_class, args.image_size, rng)
+    data = dm.get_dataset_files()
+
+    results = {}
+    for cached in (False, True):
+        tensor_dir = str(workdir / "train" / "index" / "tensors") if cached else None
+        mm = open_model(dm, tensor_cache_dir=tensor_dir)
+        if cached:
+            mm._cache_tensors(data["ia"] + data["real"])  # Filled once, as after the first run
+        elapsed, metrics = timed(mm.train, data, epochs=args.epochs)
+        results["tensor_cache" if cached else "decode"] = {
+            "seconds": elapsed,
+            "images_per_sec": metrics.get("images_per_sec"),
+        }
+    results["images"] = per_class * 2
+    results["epochs"] = args.epochs
+    return results
+
+
+def bench_data(workdir: Path, args, rng):
+    results = []
+    for size in args.index_sizes:
+        dm = DataManager(str(workdir / f"data_{size}"))
+        elapsed_fill, _ = timed(fill_index, dm, size, rng)
+        files = make_images(dm.paths["entrada"], args.images, args.image_size, rng)
+
+        # First scan hashes every file; the second hits the stat-keyed hash cache
+        cold, queue = timed(dm.scan_entrada)
+        warm, _ = timed(dm.scan_entrada)
+        items = [{"filename": name, "label": "ia" if i % 2 else "real"} for i, name in enumerate(queue)]
+        processed_time, processed = timed(dm.process_batch, items)
+
+        results.append({
+            "index_size": size,
+            "index_fill_seconds": elapsed_fill,
+            "entrada_images": len(files),
+            "scan_entrada_cold_ms": cold * 1000,
+            "scan_entrada_warm_ms": warm * 1000,
+            "process_batch_ms": processed_time * 1000,
+            "process_batch_per_image_ms": processed_time * 1000 / max(1, len(items)),
+            "processed": {key: processed[key] for key in ("real", "ia", "errors")},
+        })
+        dm.index.close()
+    return results
+
+
+def bench_api(workdir: Path, args, rng):
+    # The app reads its data folder at import time: point it at the synthetic one,
+    # so nothing is created or migrated in the real data folder
+    data_dir = workdir / "api"
+    make_images(data_dir / "entrada", args.images, args.image_size, rng)
+    os.environ["CLASIFICADOR_DATA_DIR"] = str(data_dir)
+    import app as app_module
+
+    # Importing app starts its warm-up (model, watcher, entrada duplicate check); let
+    # all of it finish so it doesn't run during the measurements
+    for thread in threading.enumerate():
+        if thread.name == "model-warm-up":
+            thread.join()
+    app_module.wait_for_model()
+    client = app_module.app.test_client()
+
+    results = {"entrada_images": args.images}
+    for name, url in (("full", "/api/images"), ("page", f"/api/images?limit={args.batch_size}")):
+        cold, response = timed(client.get, url)
+        if response.status_code != 200:
+            raise RuntimeError(f"{url} returned {response.status_code}: {response.get_data(as_text=True)}")
+        warm = [timed(client.get, url)[0] for _ in range(args.api_runs)]
+        results[name] = {"cold_ms": cold * 1000, **{f"warm_{k}": v for k, v in percentiles_ms(warm).items()}}
+        # The next URL starts with no cached predictions again
+        app_module.mm.prediction_cache.invalidate(f"bench-{name}")
+    return results
+
+
+def environment(args):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    info = {
+        "commit": commit,
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "args": {k: v for k, v in vars(args).items() if k != "func"},
+    }
+    if any(name in args.only for name in ("predict", "train", "api")):
+        import torch
+
+        info.update(torch=torch.__version__, torch_threads=torch.get_num_threads())
+    return info
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", default="bench_results.json", help="JSON results file")
+    parser.add_argument("--only", default=",".join(BENCHMARKS), help="Comma separated: " + ",".join(BENCHMARKS))
+    parser.add_argument("--images", type=int, default=64, help="Synthetic images per benchmark")
+    parser.add_argument("--image-size", default="640x480", help="WIDTHxHEIGHT")
+    parser.add_argument("--index-sizes", default="0,1000,10000", help="Index sizes for the data benchmark")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=4, help="Decoding threads for predict_batch")
+    parser.add_argument("--latency-runs", type=int, default=30)
+    parser.add_argument("--api-runs", type=int, default=5)
+    parser.add_argument("--epochs", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", default=None, help="Keep the synthetic data here (default: temp folder)")
+    args = parser.parse_args()
+    args.only = [name for name in args.only.split(",") if name]
+    args.image_size = tuple(int(v) for v in args.image_size.lower().split("x"))
+    args.index_sizes = [int(v) for v in args.index_sizes.split(",")]
+    unknown = set(args.only) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    report = {"environment": environment(args), "results": {}}
+    with tempfile.TemporaryDirectory(prefix="bench_suite_") as tmp:
+        workdir = Path(args.workdir or tmp)
+        for name in args.only:
+            # Each benchmark gets its own generator, so --only doesn't change the data
+            rng = np.random.default_rng([args.seed, BENCHMARKS.index(name)])
+            print(f"== {name}", flush=True)
+            elapsed, result = timed(globals()[f"bench_{name}"], workdir, args, rng)
+            report["results"][name] = result
+            print(json.dumps(result, indent=2), f"\n({elapsed:.1f} s)", flush=True)
+
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
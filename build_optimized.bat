@@ -19,6 +19,12 @@ pyinstaller --noconfirm ^
     --hidden-import=webview ^
     --hidden-import=flask ^
     --hidden-import=engineio.async_drivers.threading ^
+    --hidden-import=sqlite3 ^
+    --hidden-import=logging.handlers ^
+    --hidden-import=cProfile ^
+    --hidden-import=pstats ^
+    --hidden-import=ctypes.util ^
+    --hidden-import=select ^
     --collect-all torch ^
     --collect-all torchvision ^
     app.py
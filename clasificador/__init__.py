@@ -0,0 +1 @@
+"""Headless entry point: python -m clasificador classify|train|stats (see __main__.py)."""
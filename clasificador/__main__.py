@@ -0,0 +1,217 @@
+"""
+Headless command line for the classifier: no Flask, no webview.
+
+    python -m clasificador classify DIR --out results.csv --batch-size 64 --workers 8
+    python -m clasificador train [--full] [--epochs 1]
+    python -m clasificador stats [--reconcile]
+    python -m clasificador migrate-layout sharded [--dry-run]
+
+DataManager and ModelManager use the same data directory layout as the desktop
+app (--data-dir, default: the project folder), including the model checkpoint and
+the prediction cache, so results computed here are reused by the app and vice versa.
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, "logic"))
+
+from data_manager import DataManager
+
+logger = logging.getLogger("clasificador")
+
+
+def open_model(data_dir: str, dm: DataManager, args):
+    # Imported here so `stats` doesn't pay for importing torch
+    from model_manager import ModelManager
+
+    return ModelManager(
+        os.path.join(data_dir, "modelo", "modelo_actual.pth"),
+        cache_path=None if getattr(args, "no_cache", False) else os.path.join(data_dir, "index", "prediction_cache.db"),
+        hash_fn=dm.get_file_hash,
+        tensor_cache_dir=os.path.join(data_dir, "index", "tensors"),
+        loader_workers=getattr(args, "loader_workers", 0),
+        inference_backend=getattr(args, "backend", "eager"),
+        calibration_files=getattr(args, "calibration_files", None),
+        inference_threads=args.threads,
+        train_threads=args.threads,
+    )
+
+
+def iter_images(folder: Path, recursive: bool):
+    """Image files under `folder`, in directory order (no full listing kept in memory)."""
+    pending = [folder]
+    while pending:
+        with os.scandir(pending.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if recursive:
+                        pending.append(entry.path)
+                elif Path(entry.name).suffix.lower() in DataManager.VALID_EXTENSIONS:
+                    yield entry.path
+
+
+def chunked(iterable, size: int):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def cmd_classify(dm: DataManager, args) -> int:
+    folder = Path(args.directory)
+    if not folder.is_dir():
+        logger.error("Not a directory: %s", folder)
+        return 2
+
+    if args.backend != "eager":
+        # Calibrate/validate the backend on the first images of the run
+        args.calibration_files = [p for _, p in zip(range(64), iter_images(folder, args.recursive))]
+    mm = open_model(args.data_dir, dm, args)
+    as_jsonl = args.out.lower().endswith((".jsonl", ".json"))
+    counts = {"ia": 0, "real": 0, "error": 0}
+    total = 0
+    started = time.perf_counter()
+    last_report = started
+
+    with open(args.out, "w", newline="", encoding="utf-8") as out:
+        writer = None if as_jsonl else csv.writer(out)
+        if writer:
+            writer.writerow(["path", "label", "confidence", "hash"])
+
+        # Chunks bound memory and let results reach the file while the run continues
+        for paths in chunked(iter_images(folder, args.recursive), args.batch_size * 16):
+            hashes = []
+            for p in paths:
+                try:
+                    hashes.append(dm.get_file_hash(p))
+                except OSError:
+                    hashes.append(None)
+            readable = [i for i, h in enumerate(hashes) if h is not None]
+            predictions = [{"label": "error", "confidence": 0.0} for _ in paths]
+            batch = mm.predict_batch([paths[i] for i in readable], batch_size=args.batch_size,
+                                     num_workers=args.workers, hashes=[hashes[i] for i in readable])
+            for i, prediction in zip(readable, batch):
+                predictions[i] = prediction
+
+            for path, file_hash, prediction in zip(paths, hashes, predictions):
+                counts[prediction["label"]] += 1
+                if writer:
+                    writer.writerow([path, prediction["label"], f"{prediction['confidence']:.6f}", file_hash or ""])
+                else:
+                    out.write(json.dumps({"path": path, "hash": file_hash, **prediction}) + "\n")
+
+            total += len(paths)
+            now = time.perf_counter()
+            if now - last_report >= args.report_every:
+                logger.info("%d images, %.1f img/s", total, total / (now - started))
+                last_report = now
+
+    elapsed = time.perf_counter() - started
+    logger.info("Classified %d images in %.1f s (%.1f img/s): %d ia, %d real, %d errors -> %s",
+                total, elapsed, total / elapsed if elapsed > 0 else 0.0,
+                counts["ia"], counts["real"], counts["error"], args.out)
+    return 0
+
+
+def cmd_train(dm: DataManager, args) -> int:
+    mm = open_model(args.data_dir, dm, args)
+    started = time.time()
+    data = dm.get_dataset_files()
+
+    if args.full:
+        new_files, trained_until = None, started
+    else:
+        new_files, trained_until = dm.get_new_samples(mm.trained_until, limit=args.max_new_samples)
+
+    metrics = mm.train(
+        data, epochs=args.epochs, new_files=new_files,
+        replay_per_class=args.replay_per_class, trained_until=trained_until
+    )
+    logger.info("Training finished in %.1f s: %s", time.time() - started, metrics)
+    return 0
+
+
+def cmd_stats(dm: DataManager, args) -> int:
+    if args.reconcile:
+        dm.reconcile_counters()
+    print(json.dumps(dm.get_detailed_stats(), indent=2))
+    return 0
+
+
+def cmd_migrate_layout(dm: DataManager, args) -> int:
+    result = dm.migrate_layout(args.layout, dry_run=args.dry_run)
+    if not args.dry_run:
+        dm.reconcile_counters()
+    print(json.dumps(result, indent=2))
+    if not args.dry_run:
+        logger.info("Set DATASET_LAYOUT = %r in app.py (or pass --layout %s) before starting the app",
+                    args.layout, args.layout)
+    return 1 if result["errors"] else 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m clasificador", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", default=ROOT_DIR,
+                        help="Folder with modelo/, index/, dataset_base/... (default: %(default)s)")
+    parser.add_argument("--log-level", default="INFO")
+    parser.add_argument("--layout", default="flat", choices=DataManager.LAYOUTS,
+                        help="Layout of clasificaciones/ (see app.py DATASET_LAYOUT)")
+    parser.add_argument("--threads", type=int, default=None,
+                        help="torch threads for inference/training (default: torch's choice, all cores)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    classify = commands.add_parser("classify", help="Classify every image in a directory")
+    classify.add_argument("directory")
+    classify.add_argument("--out", default="results.csv", help="Output file: .csv, or .jsonl for JSON lines")
+    classify.add_argument("--batch-size", type=int, default=64)
+    classify.add_argument("--workers", type=int, default=4, help="Image decoding threads")
+    classify.add_argument("--recursive", action="store_true")
+    classify.add_argument("--backend", default="eager",
+                          help="Inference backend: eager, channels_last, torchscript, compile, "
+                               "int8_dynamic, int8_static, onnxruntime")
+    classify.add_argument("--no-cache", action="store_true", help="Don't read or write the prediction cache")
+    classify.add_argument("--report-every", type=float, default=10.0, help="Seconds between progress lines")
+    classify.set_defaults(func=cmd_classify)
+
+    train = commands.add_parser("train", help="Train on the dataset (incremental unless --full)")
+    train.add_argument("--full", action="store_true", help="Retrain on every image")
+    train.add_argument("--epochs", type=int, default=1)
+    train.add_argument("--max-new-samples", type=int, default=512)
+    train.add_argument("--replay-per-class", type=int, default=256)
+    train.add_argument("--loader-workers", type=int, default=0, help="DataLoader worker processes")
+    train.set_defaults(func=cmd_train)
+
+    stats = commands.add_parser("stats", help="Print dataset statistics as JSON")
+    stats.add_argument("--reconcile", action="store_true",
+                       help="Recount the folders first (after files were added or removed outside the app)")
+    stats.set_defaults(func=cmd_stats)
+
+    migrate = commands.add_parser("migrate-layout", help="Move clasificaciones/ images to another layout")
+    migrate.add_argument("layout", choices=DataManager.LAYOUTS)
+    migrate.add_argument("--dry-run", action="store_true", help="Only report what would be moved")
+    migrate.set_defaults(func=cmd_migrate_layout)
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=args.log_level.upper(), stream=sys.stderr,
+                        format="%(asctime)s %(levelname)s %(name)s: %(message)s", datefmt="%H:%M:%S")
+    dm = DataManager(args.data_dir, layout=args.layout)
+    return args.func(dm, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
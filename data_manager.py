@@ -1,15 +1,65 @@
 import os
+import base64
 import json
+import logging
 import shutil
 import time
-import hashlib
 import sys
-from typing import List, Dict, Optional
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Dict, Optional, Tuple
 from pathlib import Path
 
+from index_store import open_index_store
+from correction_log import CorrectionLog
+from file_hasher import FileHasher, hamming_distance
+from metrics import metrics
+from directory_watcher import DirectoryState, DirectoryWatcher
+
+logger = logging.getLogger(__name__)
+
+
+class DuplicateImageError(Exception):
+    """Raised by save_upload when the uploaded image is already known."""
+
+    def __init__(self, filename: str, reason: str, match: str):
+        super().__init__(f"{filename} is a duplicate ({reason}: {match})")
+        self.filename = filename
+        self.reason = reason  # 'index', 'entrada' or 'similar'
+        self.match = match
+
+
 class DataManager:
-    def __init__(self, base_path: str):
+    # Entries of self.paths that are files (only their parent folder is created)
+    FILE_KEYS = ("index", "index_db", "logs", "logs_legacy")
+
+    VALID_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+    # Folders whose listing start_watcher() keeps in memory (the clasificaciones
+    # ones only in the flat layout) and whose files are counted in the stats
+    WATCHED_FOLDERS = ("entrada", "dataset_base_real", "dataset_base_ia", "clasificaciones_real", "clasificaciones_ia")
+    CLASSIFIED_FOLDERS = ("clasificaciones_real", "clasificaciones_ia")
+    # Folders with a persisted counter (see reconcile_counters). Not entrada: files
+    # are dropped there by hand, so only a listing can count it.
+    COUNTED_FOLDERS = ("dataset_base_real", "dataset_base_ia", "clasificaciones_real", "clasificaciones_ia")
+    # Where process_batch puts accepted images inside clasificaciones/<label>/:
+    # "flat": <filename>; "sharded": <hash[:2]>/<hash[2:4]>/<hash><ext>, which keeps
+    # every folder small with hundreds of thousands of images (see migrate_layout)
+    LAYOUTS = ("flat", "sharded")
+
+    def __init__(self, base_path: str, index_backend: str = "sqlite", hash_algorithm: str = "md5",
+                 perceptual_threshold: Optional[int] = None, io_workers: int = 8, layout: str = "flat"):
+        if layout not in self.LAYOUTS:
+            raise ValueError(f"Unknown dataset layout: {layout}")
         self.base_path = Path(base_path)
+        self.layout = layout
+        # Threads that hash and move files in process_batch
+        self.io_workers = io_workers
+        # Changing the algorithm changes the index keys: existing entries keep their old hashes
+        self.hasher = FileHasher(hash_algorithm)
+        # Max dHash bit distance to treat two images as near-duplicates (None = exact only)
+        self.perceptual_threshold = perceptual_threshold
+        self._indexed_phashes = None
         
         self.paths = {
             "dataset_base_real": self.base_path / "dataset_base" / "real",
@@ -18,14 +68,27 @@ class DataManager:
             "clasificaciones_ia": self.base_path / "clasificaciones" / "ia",
             "entrada": self.base_path / "entrada",
             "index": self.base_path / "index" / "dataset_index.json",
-            "logs": self.base_path / "logs" / "historial_correcciones.json",
+            "index_db": self.base_path / "index" / "dataset_index.db",
+            "logs": self.base_path / "logs" / "historial_correcciones.jsonl",
+            "logs_legacy": self.base_path / "logs" / "historial_correcciones.json",
         }
         self._ensure_files()
+        self.index = open_index_store(index_backend, self.paths["index"], self.paths["index_db"])
+        self.correction_log = CorrectionLog(self.paths["logs"], legacy_json_path=self.paths["logs_legacy"])
+        # {folder key: DirectoryState} once start_watcher() runs; until then folders are listed from disk
+        self.folder_states = {}
+        self.watcher = None
+        # Duplicate check of each entrada file, done once when it arrives (or changes):
+        # {name: (stat key, content hash, find_duplicate() result)}. Queued files (not
+        # duplicates) are also in _entrada_by_hash, {hash: name}.
+        self._entrada_checks = {}
+        self._entrada_by_hash = {}
+        self._entrada_lock = threading.RLock()
 
     def _ensure_files(self):
         # Ensure all directories exist
         for key, path in self.paths.items():
-            if key == "index" or key == "logs":
+            if key in self.FILE_KEYS:
                 path.parent.mkdir(parents=True, exist_ok=True)
             else:
                 path.mkdir(parents=True, exist_ok=True)
@@ -37,186 +100,644 @@ class DataManager:
                 if bundled_index.exists():
                     try:
                         shutil.copy(str(bundled_index), str(self.paths["index"]))
-                        print(f"Copied bundled index to {self.paths['index']}")
+                        logger.info("Copied bundled index to %s", self.paths["index"])
                     except Exception as e:
-                        print(f"Failed to copy bundled index: {e}")
+                        logger.error("Failed to copy bundled index: %s", e)
             
             # If still doesn't exist (copy failed or not frozen/bundled), create empty
             if not self.paths["index"].exists():
                 with open(self.paths["index"], "w") as f:
                     json.dump({}, f)
 
-        if not self.paths["logs"].exists():
-            with open(self.paths["logs"], "w") as f:
-                json.dump([], f)
-
     def get_file_hash(self, file_path: Path) -> str:
-        hasher = hashlib.md5()
-        with open(file_path, "rb") as f:
-            buf = f.read()
-            hasher.update(buf)
-        return hasher.hexdigest()
+        """Chunked content hash, cached by file stat so unchanged files aren't reread."""
+        with metrics.timer("stage_seconds", stage="hash"):
+            return self.hasher.hash(file_path)
 
     def load_index(self) -> Dict:
-        with open(self.paths["index"], "r") as f:
-            return json.load(f)
+        """Returns the whole index as a dict. Prefer self.index queries on large datasets."""
+        return dict(self.index.items())
 
     def save_index(self, index_data: Dict):
-        with open(self.paths["index"], "w") as f:
-            json.dump(index_data, f, indent=4)
+        """Upserts the given entries into the index in a single transaction."""
+        self.index.put_many(index_data)
 
     def log_action(self, action: Dict):
-        with open(self.paths["logs"], "r") as f:
-            logs = json.load(f)
-        logs.append(action)
-        with open(self.paths["logs"], "w") as f:
-            json.dump(logs, f, indent=4)
+        self.correction_log.append_many([action])
+
+    def get_history(self, action: Optional[str] = None, since: Optional[float] = None):
+        """Streams logged corrections, optionally filtered by action type and timestamp."""
+        return self.correction_log.iter_entries(action=action, since=since)
+
+    def start_watcher(self, on_change: Optional[Callable[[str, List[str]], None]] = None,
+                      backend: str = "auto", poll_interval: float = 2.0, dataset_poll_interval: float = 300.0):
+        """
+        Lists the WATCHED_FOLDERS once and keeps those listings current in memory
+        (inotify on Linux, polling elsewhere), so scans and stats don't touch the disk.
+        When polling, only entrada is re-listed every `poll_interval` seconds; the
+        dataset folders (possibly huge) every `dataset_poll_interval`, since this class
+        updates them itself on every accept.
+        on_change(folder key, names) receives files that appear or finish writing.
+        Sharded clasificaciones folders are not watched (one watch per shard folder
+        wouldn't scale); their counts come from the persisted counters instead.
+        """
+        keys = [key for key in self.WATCHED_FOLDERS
+                if self.layout == "flat" or key not in self.CLASSIFIED_FOLDERS]
+        states = {
+            key: DirectoryState(self.paths[key], self.VALID_EXTENSIONS if key == "entrada" else None)
+            for key in keys
+        }
+
+        def changed(key: str, names: List[str]):
+            if key == "entrada":
+                self._check_entrada(names)
+            if on_change:
+                on_change(key, names)
+
+        watcher = DirectoryWatcher(states, on_change=changed, backend=backend, poll_interval=poll_interval,
+                                   slow_folders=[key for key in keys if key != "entrada"],
+                                   slow_poll_interval=dataset_poll_interval)
+        watcher.start()
+        self.watcher = watcher
+        self.folder_states = states
+
+    def stop_watcher(self):
+        if self.watcher:
+            self.watcher.stop()
+        self.watcher = None
+        self.folder_states = {}
+
+    def _folder_names(self, key: str) -> List[str]:
+        """
+        Names of the files in folder `key`, from memory when it is watched. For the
+        clasificaciones folders these are paths relative to the folder, including
+        files in shard subfolders, so either layout (or a mix of both) is listed.
+        """
+        state = self.folder_states.get(key)
+        if state is not None:
+            return state.names()
+        if not self.paths[key].exists():
+            return []
+        if key not in self.CLASSIFIED_FOLDERS:
+            return [f.name for f in self.paths[key].iterdir() if f.is_file()]
+
+        names = []
+        pending = [(self.paths[key], "")]
+        while pending:
+            folder, prefix = pending.pop()
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append((Path(entry.path), f"{prefix}{entry.name}/"))
+                    elif entry.is_file():
+                        names.append(prefix + entry.name)
+        return names
+
+    def dataset_path(self, label: str, filename: str, file_hash: str, layout: Optional[str] = None) -> Path:
+        """Destination of an accepted image in clasificaciones/<label>/ for `layout` (default: self.layout)."""
+        folder = self.paths[f"clasificaciones_{label}"]
+        if (layout or self.layout) == "sharded":
+            return folder / file_hash[:2] / file_hash[2:4] / f"{file_hash}{Path(filename).suffix.lower()}"
+        return folder / filename
+
+    def _folder_changed(self, key: str, name: str):
+        """Applies a change made by this class right away, ahead of the watcher's event."""
+        state = self.folder_states.get(key)
+        if state is not None:
+            state.update(name)
+        if key == "entrada":
+            self._check_entrada([name])
+
+    def _list_entrada(self) -> List[Path]:
+        state = self.folder_states.get("entrada")
+        if state is not None:
+            return [self.paths["entrada"] / name for name in state.names()]
+        return [f for f in self.paths["entrada"].iterdir() if f.suffix.lower() in self.VALID_EXTENSIONS]
+
+    def _get_indexed_phashes(self) -> Dict[str, str]:
+        """{phash: file_hash} of indexed images, loaded once and kept up to date by process_batch."""
+        if self._indexed_phashes is None:
+            self._indexed_phashes = {
+                entry["phash"]: file_hash
+                for file_hash, entry in self.index.items() if entry.get("phash")
+            }
+        return self._indexed_phashes
+
+    def find_duplicate(self, file_path: Path, seen_hashes: Optional[Dict[str, str]] = None):
+        """
+        Checks a file against the dataset index (and `seen_hashes`, {hash: filename} of
+        files already accepted in entrada). Returns (reason, match) or None.
+        """
+        file_hash = self.get_file_hash(file_path)
+        with metrics.timer("stage_seconds", stage="index_read"):
+            indexed = file_hash in self.index
+        if indexed:
+            return "index", file_hash
+        if seen_hashes is not None and file_hash in seen_hashes:
+            return "entrada", seen_hashes[file_hash]
+
+        if self.perceptual_threshold is not None:
+            try:
+                phash = self.hasher.perceptual_hash(file_path)
+            except Exception as e:
+                logger.warning("Could not compute perceptual hash of %s: %s", file_path, e)
+                return None
+            for known_phash, known_hash in self._get_indexed_phashes().items():
+                if hamming_distance(phash, known_phash) <= self.perceptual_threshold:
+                    return "similar", known_hash
+        return None
+
+    def _entrada_stats(self) -> Dict[str, os.stat_result]:
+        """{name: stat} of the images in entrada, from memory when it is watched."""
+        state = self.folder_states.get("entrada")
+        if state is not None:
+            return state.stats()
+        stats = {}
+        with os.scandir(self.paths["entrada"]) as entries:
+            for entry in entries:
+                if os.path.splitext(entry.name)[1].lower() in self.VALID_EXTENSIONS:
+                    try:
+                        if entry.is_file():
+                            stats[entry.name] = entry.stat()
+                    except OSError:
+                        continue  # Removed while listing
+        return stats
+
+    def _forget_entrada(self, name: str):
+        # Caller holds self._entrada_lock
+        check = self._entrada_checks.pop(name, None)
+        if check is None or self._entrada_by_hash.get(check[1]) != name:
+            return
+        del self._entrada_by_hash[check[1]]
+        # Files hidden as repeats of this one are checked again
+        for other, (_, _, duplicate) in list(self._entrada_checks.items()):
+            if duplicate == ("entrada", name):
+                del self._entrada_checks[other]
+
+    def _check_entrada(self, names: Optional[List[str]] = None) -> Dict[str, os.stat_result]:
+        """
+        Duplicate-checks the entrada files that are new or changed since their last
+        check: `names` only, or every file (also forgetting the ones that left) when
+        None. Returns {name: stat} of the listed files that are queued (not duplicates).
+        Steady state costs a dict lookup per file: nothing is hashed or queried again.
+        """
+        if names is None:
+            listing = self._entrada_stats()
+        else:
+            listing = {}
+            for name in names:
+                try:
+                    listing[name] = os.stat(self.paths["entrada"] / name)
+                except OSError:
+                    listing[name] = None
+
+        queued = {}
+        with self._entrada_lock:
+            if names is None:
+                for name in [n for n in self._entrada_checks if n not in listing]:
+                    self._forget_entrada(name)
+            # Sorted, so of two equal files the first name is the one kept
+            for name in sorted(listing):
+                st = listing[name]
+                if st is None:
+                    self._forget_entrada(name)
+                    continue
+                key = (st.st_size, st.st_mtime_ns, st.st_ino)
+                check = self._entrada_checks.get(name)
+                if check is None or check[0] != key:
+                    self._forget_entrada(name)
+                    path = self.paths["entrada"] / name
+                    try:
+                        duplicate = self.find_duplicate(path, self._entrada_by_hash)
+                        file_hash = self.get_file_hash(path)
+                    except OSError as e:
+                        logger.warning("Could not read %s: %s", name, e)
+                        continue
+                    if duplicate is None:
+                        self._entrada_by_hash[file_hash] = name
+                    check = self._entrada_checks[name] = (key, file_hash, duplicate)
+                if check[2] is None:
+                    queued[name] = st
+        return queued
+
+    def check_entrada(self):
+        """
+        Duplicate-checks every entrada file not checked yet. Call it once after
+        startup (off the critical path: it hashes every queued file) so the first
+        listing doesn't pay for it; later arrivals are checked as they come.
+        """
+        self._check_entrada()
 
     def scan_entrada(self) -> List[str]:
-        """Returns list of image files in entrada that are not indexed."""
-        valid_extensions = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
-        files = []
-        index = self.load_index()
-        
-        # Create a set of existing hashes to avoid duplicates if needed, 
-        # but user said "if image already in index, don't reclassify".
-        # We'll check by filename first for speed, then hash if needed? 
-        # User said "timestamp and hash... to avoid reprocessing".
-        # For now, let's just list files in entrada.
-        
-        for f in self.paths["entrada"].iterdir():
-            if f.suffix.lower() in valid_extensions:
-                files.append(str(f.name))
-        return files
+        """
+        Returns list of image files in entrada that are not indexed.
+        Files whose content is already in the index, or repeated inside entrada,
+        are skipped so they are never reclassified.
+        """
+        with metrics.timer("operation_seconds", operation="scan_entrada"):
+            return sorted(self._check_entrada())
+
+    def remove_entrada_file(self, filename: str):
+        """Deletes a file from entrada (raises FileNotFoundError if it isn't there)."""
+        os.remove(str(self.paths["entrada"] / filename))
+        self._folder_changed("entrada", filename)
+
+    def entrada_duplicates(self) -> List[Dict]:
+        """
+        The entrada files left out of scan_entrada() and entrada_page() as duplicates:
+        [{'filename', 'reason' ('index', 'entrada' or 'similar'), 'match'}], by name.
+        """
+        self._check_entrada()
+        with self._entrada_lock:
+            return [{"filename": name, "reason": duplicate[0], "match": duplicate[1]}
+                    for name, (_, _, duplicate) in sorted(self._entrada_checks.items()) if duplicate]
+
+    def entrada_duplicate_count(self) -> int:
+        """Number of duplicates among the entrada files checked so far (no new check)."""
+        with self._entrada_lock:
+            return sum(1 for _, _, duplicate in self._entrada_checks.values() if duplicate)
+
+    def remove_entrada_duplicates(self, filenames: Optional[List[str]] = None) -> Dict[str, List]:
+        """
+        Deletes the entrada files reported by entrada_duplicates() (only those among
+        `filenames` if given; other names are ignored). Returns {'removed', 'errors'}.
+        """
+        duplicates = [d["filename"] for d in self.entrada_duplicates()]
+        if filenames is not None:
+            wanted = set(filenames)
+            duplicates = [name for name in duplicates if name in wanted]
+        result = {"removed": [], "errors": []}
+        for name in duplicates:
+            try:
+                self.remove_entrada_file(name)
+                result["removed"].append(name)
+            except OSError as e:
+                result["errors"].append({"filename": name, "error": str(e)})
+        return result
+
+    def dataset_file_removed(self, label: str, name: str):
+        """
+        Records that clasificaciones/<label>/<name> (path relative to that folder) was
+        moved or deleted by other code, such as the subclassifier, so the listings
+        and the persisted counters stay current without a reconcile.
+        """
+        key = f"clasificaciones_{label}"
+        self._folder_changed(key, name)
+        self.index.add_counters({key: -1})
+
+    def get_entrada_hashes(self) -> Dict[str, str]:
+        """{content hash: filename} of the images currently in entrada."""
+        self._check_entrada()
+        with self._entrada_lock:
+            return {file_hash: name for name, (_, file_hash, _) in self._entrada_checks.items()}
+
+    ENTRADA_SORT_KEYS = {
+        "name": lambda st, name: name.lower(),
+        "mtime": lambda st, name: st.st_mtime,
+        "size": lambda st, name: st.st_size,
+    }
+
+    def entrada_page(self, sort: str = "name", descending: bool = False,
+                     cursor: Optional[str] = None, limit: int = 100) -> Dict:
+        """
+        One page of scan_entrada(), ordered by `sort` ('name', 'mtime' or 'size').
+        Returns {'files', 'next_cursor', 'total'}; pass next_cursor back to get the
+        following page (None when there are no more). The cursor marks the last file
+        returned rather than an offset, so accepting or removing files between
+        requests doesn't skip or repeat any.
+        """
+        if sort not in self.ENTRADA_SORT_KEYS:
+            raise ValueError(f"Unknown sort key: {sort}")
+        key_fn = self.ENTRADA_SORT_KEYS[sort]
 
-    def save_upload(self, file_storage, filename: str) -> str:
-        """Saves an uploaded file to the entrada directory."""
+        with metrics.timer("operation_seconds", operation="entrada_page"):
+            keyed = sorted((((key_fn(st, name), name), name) for name, st in self._check_entrada().items()),
+                           reverse=descending)
+
+        start = 0
+        if cursor:
+            after = tuple(json.loads(base64.urlsafe_b64decode(cursor.encode("ascii"))))
+            # First position past the cursor in the current sort order
+            start = next((i for i, (key, _) in enumerate(keyed) if (key < after if descending else key > after)),
+                         len(keyed))
+
+        page = keyed[start:start + limit]
+        next_cursor = None
+        if start + limit < len(keyed) and page:
+            next_cursor = base64.urlsafe_b64encode(json.dumps(list(page[-1][0])).encode("utf-8")).decode("ascii")
+        return {"files": [name for _, name in page], "next_cursor": next_cursor, "total": len(keyed)}
+
+    def save_upload(self, file_storage, filename: str, skip_duplicates: bool = True,
+                    entrada_hashes: Optional[Dict[str, str]] = None) -> str:
+        """
+        Saves an uploaded file to the entrada directory.
+        Raises DuplicateImageError (and discards the file) if its content is already
+        in the index or in entrada. When uploading many files, pass the same
+        `entrada_hashes` (see get_entrada_hashes) to every call: it is updated with
+        each saved file, so repeats inside one upload are caught too.
+        """
         target_path = self.paths["entrada"] / filename
-        file_storage.save(str(target_path))
+        if not skip_duplicates:
+            file_storage.save(str(target_path))
+            self._folder_changed("entrada", filename)
+            return str(target_path)
+
+        # Write to a hidden temp name first so the queue never lists a duplicate
+        tmp_path = self.paths["entrada"] / f".{uuid.uuid4().hex}.upload"
+        file_storage.save(str(tmp_path))
+        try:
+            if entrada_hashes is None:
+                entrada_hashes = self.get_entrada_hashes()
+            duplicate = self.find_duplicate(tmp_path, entrada_hashes)
+            # Re-uploading a file under its own name replaces it, it's not a duplicate
+            if duplicate and duplicate[0] == "entrada" and duplicate[1] == filename:
+                duplicate = None
+        except Exception:
+            os.remove(str(tmp_path))
+            raise
+
+        if duplicate:
+            os.remove(str(tmp_path))
+            raise DuplicateImageError(filename, *duplicate)
+
+        os.replace(str(tmp_path), str(target_path))
+        self._folder_changed("entrada", filename)
+        entrada_hashes[self.get_file_hash(target_path)] = filename
         return str(target_path)
 
-    def process_batch(self, items: List[Dict[str, str]]) -> Dict[str, int]:
+    def process_batch(self, items: List[Dict[str, str]]) -> Dict:
         """
         Process a batch of accepted images.
         items: list of {'filename': str, 'label': str}
-        Returns stats of processed items.
+        Returns counts {'real', 'ia', 'errors'} plus 'items': one
+        {'filename', 'label', 'status': 'ok' | 'error', 'error'} per input item, in order.
         """
-        processed = {"real": 0, "ia": 0, "errors": 0}
-        print(f"DEBUG: Processing batch of {len(items)} items. Base path: {self.base_path}")
-        
-        index = self.load_index()
-        
-        for item in items:
-            filename = item['filename']
-            label = item['label']
-            
-            src = self.paths["entrada"] / filename
-            if not src.exists():
-                print(f"ERROR: Source file not found: {src}")
-                processed["errors"] += 1
-                continue
-                
-            dest_folder = self.paths[f"clasificaciones_{label}"]
-            dest = dest_folder / filename
-            
-            print(f"DEBUG: Moving {filename} to {label} folder: {dest_folder}")
-            
+        with metrics.timer("operation_seconds", operation="process_batch"):
+            processed = self._process_batch(items)
+        for result in ("real", "ia", "errors"):
+            metrics.inc("images_processed_total", processed[result], result=result)
+        return processed
+
+    def _move_item(self, filename: str, label: str) -> Tuple[Dict, bool]:
+        """
+        Hashes one entrada file and moves it to clasificaciones/<label>. Runs in the I/O pool.
+        Returns (index entry, whether a file with that name was already there).
+        """
+        src = self.paths["entrada"] / filename
+        if not src.exists():
+            raise FileNotFoundError(f"Source file not found: {src}")
+
+        logger.debug("Moving %s to %s folder", filename, label)
+        # Calculate hash before moving
+        file_hash = self.get_file_hash(src)
+        dest = self.dataset_path(label, filename, file_hash)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        phash = None
+        if self.perceptual_threshold is not None:
+            try:
+                phash = self.hasher.perceptual_hash(src)
+            except Exception as e:
+                logger.warning("Could not compute perceptual hash of %s: %s", filename, e)
+
+        replaced = dest.exists()
+        # Try move
+        with metrics.timer("stage_seconds", stage="move"):
             try:
-                # Ensure destination folder exists
-                if not dest_folder.exists():
-                    print(f"DEBUG: Creating folder {dest_folder}")
-                    dest_folder.mkdir(parents=True, exist_ok=True)
-                
-                # Calculate hash before moving
-                file_hash = self.get_file_hash(src)
-                
-                # Try move
+                shutil.move(str(src), str(dest))
+            except OSError as e:
+                logger.warning("Move failed (%s), trying copy+delete...", e)
+                shutil.copy2(str(src), str(dest))
+                os.remove(str(src))
+
+        # Verify move
+        if not dest.exists():
+            raise Exception(f"Destination file {dest} does not exist after move/copy")
+        self._folder_changed("entrada", filename)
+        self._folder_changed(f"clasificaciones_{label}", filename)
+
+        entry = {
+            "path": str(dest),
+            "filename": filename,
+            "label": label,
+            "origin": "clasificaciones",
+            "timestamp": time.time(),
+            "hash": file_hash
+        }
+        if phash:
+            entry["phash"] = phash
+        return entry, replaced
+
+    def _process_batch(self, items: List[Dict[str, str]]) -> Dict:
+        processed = {"real": 0, "ia": 0, "errors": 0}
+        logger.debug("Processing batch of %d items. Base path: %s", len(items), self.base_path)
+        results = [{"filename": item.get("filename"), "label": item.get("label"), "status": "error", "error": None}
+                   for item in items]
+
+        # Validated up front so the pool only does file I/O: known label, plain
+        # filename, and each file at most once (two workers must not move the same file)
+        pending = {}
+        for i, item in enumerate(items):
+            filename, label = item.get("filename"), item.get("label")
+            if label not in ("real", "ia"):
+                results[i]["error"] = f"Unknown label: {label}"
+            elif not filename or os.path.basename(filename) != filename:
+                results[i]["error"] = f"Invalid filename: {filename}"
+            elif filename in pending:
+                results[i]["error"] = "Repeated in this batch"
+            else:
+                pending[filename] = i
+
+        # New index entries and log actions, committed together at the end of the batch
+        new_entries = {}
+        actions = []
+        counter_deltas = {}
+
+        # Hashing and moving are I/O bound (network shares especially): overlap them
+        with ThreadPoolExecutor(max_workers=max(1, self.io_workers)) as pool:
+            futures = {i: pool.submit(self._move_item, filename, items[i]["label"])
+                       for filename, i in pending.items()}
+            for i, future in futures.items():
+                filename, label = items[i]["filename"], items[i]["label"]
                 try:
-                    shutil.move(str(src), str(dest))
-                except OSError as e:
-                    print(f"WARNING: Move failed ({e}), trying copy+delete...")
-                    shutil.copy2(str(src), str(dest))
-                    os.remove(str(src))
-                
-                # Verify move
-                if not dest.exists():
-                    raise Exception(f"Destination file {dest} does not exist after move/copy")
-                
-                # Update index
-                entry = {
-                    "path": str(dest),
-                    "label": label,
-                    "origin": "clasificaciones",
-                    "timestamp": time.time(),
-                    "hash": file_hash
-                }
-                index[file_hash] = entry
-                
-                # Log
-                self.log_action({
+                    entry, replaced = future.result()
+                except Exception as e:
+                    logger.error("Failed to process %s: %s", filename, e)
+                    results[i]["error"] = str(e)
+                    continue
+
+                if entry.get("phash"):
+                    self._get_indexed_phashes()[entry["phash"]] = entry["hash"]
+                new_entries[entry["hash"]] = entry
+                actions.append({
                     "action": "accept",
                     "file": filename,
                     "destination": label,
                     "timestamp": time.time()
                 })
-                
+                if not replaced:
+                    key = f"clasificaciones_{label}"
+                    counter_deltas[key] = counter_deltas.get(key, 0) + 1
+                results[i]["status"] = "ok"
                 processed[label] += 1
-                print(f"SUCCESS: Processed {filename}")
-                
-            except Exception as e:
-                print(f"ERROR: Failed to process {filename}: {e}")
-                import traceback
-                traceback.print_exc()
-                processed["errors"] += 1
-                
-        self.save_index(index)
+                logger.debug("Processed %s", filename)
+
+        processed["errors"] = sum(1 for r in results if r["status"] == "error")
+        with metrics.timer("stage_seconds", stage="index_write"):
+            self.index.put_many(new_entries, counter_deltas=counter_deltas)
+        with metrics.timer("stage_seconds", stage="log_write"):
+            self.correction_log.append_many(actions)
+        processed["items"] = results
         return processed
 
     def get_dataset_files(self) -> Dict[str, List[str]]:
         """Returns all files for training (base + clasificaciones)"""
         data = {"real": [], "ia": []}
-        
-        # Base
-        if self.paths["dataset_base_real"].exists():
-            for f in self.paths["dataset_base_real"].iterdir():
-                data["real"].append(str(f))
-        if self.paths["dataset_base_ia"].exists():
-            for f in self.paths["dataset_base_ia"].iterdir():
-                data["ia"].append(str(f))
-            
-        # Clasificaciones
-        if self.paths["clasificaciones_real"].exists():
-            for f in self.paths["clasificaciones_real"].iterdir():
-                data["real"].append(str(f))
-        if self.paths["clasificaciones_ia"].exists():
-            for f in self.paths["clasificaciones_ia"].iterdir():
-                data["ia"].append(str(f))
-            
+        for label in ("real", "ia"):
+            for key in (f"dataset_base_{label}", f"clasificaciones_{label}"):
+                data[label].extend(str(self.paths[key] / name) for name in self._folder_names(key))
         return data
 
+    def get_new_samples(self, since: float, limit: Optional[int] = None):
+        """
+        Indexed images added after `since`: the oldest `limit` of them, so that
+        advancing the watermark to the returned timestamp never skips a sample and
+        later runs drain a larger backlog.
+        Returns ({'real': [paths], 'ia': [paths]}, newest timestamp in that window,
+        or `since` if none).
+        """
+        entries = self.index.query_since(since, None if limit is None else limit + 1)
+        if limit is not None and len(entries) > limit:
+            # The window must not end in the middle of entries sharing a timestamp
+            # (coarse clocks), or the rest of them would fall behind the watermark
+            boundary = entries[limit]["timestamp"]
+            entries = [e for e in entries[:limit] if e["timestamp"] < boundary]
+            if not entries:
+                entries = [e for e in self.index.query_since(since) if e["timestamp"] == boundary]
+
+        data = {"real": [], "ia": []}
+        newest = since
+        for entry in entries:
+            # Entries whose file is gone still move the watermark past them
+            newest = max(newest, entry["timestamp"])
+            if entry.get("label") in data and Path(entry["path"]).exists():
+                data[entry["label"]].append(entry["path"])
+        return data, newest
+
+    def has_new_samples(self, since: float) -> bool:
+        """True if any image was indexed after `since` (e.g. past a get_new_samples window)."""
+        return bool(self.index.query_since(since, 1))
+
+    def migrate_layout(self, layout: str, dry_run: bool = False, commit_every: int = 500) -> Dict[str, int]:
+        """
+        Moves every file of clasificaciones/{real,ia} to its place in `layout` and
+        updates the index paths (entries also get the original 'filename', which the
+        flat layout uses as the file name). Run it with the app closed, then start
+        the app with the same layout. Safe to re-run after an interruption: files
+        already in place are skipped and the index is committed every `commit_every`
+        moves. Returns {'moved', 'skipped', 'conflicts', 'errors'}.
+        """
+        if layout not in self.LAYOUTS:
+            raise ValueError(f"Unknown dataset layout: {layout}")
+        result = {"moved": 0, "skipped": 0, "conflicts": 0, "errors": 0}
+        updates = {}
+
+        for key in self.CLASSIFIED_FOLDERS:
+            label = key.split("_", 1)[1]
+            root = self.paths[key]
+            for name in self._folder_names(key):
+                src = root / name
+                try:
+                    file_hash = self.get_file_hash(src)
+                    entry = self.index.get(file_hash)
+                    filename = (entry or {}).get("filename") or src.name
+                    dest = self.dataset_path(label, filename, file_hash, layout=layout)
+                    if dest == src:
+                        result["skipped"] += 1
+                        continue
+                    if dest.exists():
+                        if layout == "sharded":
+                            # Same content already in place: leave this copy for the user to review
+                            logger.warning("Not migrating %s: same content already at %s", src, dest)
+                            result["conflicts"] += 1
+                            continue
+                        # Two different images with the same original name
+                        dest = dest.with_name(f"{dest.stem}_{file_hash[:8]}{dest.suffix}")
+                    if dry_run:
+                        result["moved"] += 1
+                        continue
+
+                    dest.parent.mkdir(parents=True, exist_ok=True)
+                    shutil.move(str(src), str(dest))
+                    result["moved"] += 1
+                    if entry is not None:
+                        entry.update(path=str(dest), filename=filename)
+                        updates[file_hash] = entry
+                except Exception as e:
+                    logger.error("Failed to migrate %s: %s", src, e)
+                    result["errors"] += 1
+
+                if len(updates) >= commit_every:
+                    self.index.put_many(updates)
+                    updates = {}
+
+            if not dry_run:
+                self.index.put_many(updates)
+                updates = {}
+                self._remove_empty_folders(root)
+
+        if not dry_run:
+            self.layout = layout
+        logger.info("Layout migration to %s%s: %s", layout, " (dry run)" if dry_run else "", result)
+        return result
+
+    @staticmethod
+    def _remove_empty_folders(root: Path):
+        """Removes shard folders left empty under `root` (deepest first)."""
+        for folder, _, _ in sorted(os.walk(root), key=lambda item: item[0].count(os.sep), reverse=True):
+            if Path(folder) != root:
+                try:
+                    os.rmdir(folder)
+                except OSError:
+                    pass  # Not empty
+
+    def reconcile_counters(self) -> Dict[str, int]:
+        """
+        Recounts the files of every COUNTED_FOLDERS folder (from memory when the
+        watcher runs, otherwise one listing each) and stores the counts as the
+        persisted counters. Needed once, and after files are added or removed
+        outside the app.
+        """
+        counts = {}
+        for key in self.COUNTED_FOLDERS:
+            state = self.folder_states.get(key)
+            counts[key] = len(state) if state is not None else len(self._folder_names(key))
+        self.index.set_counters(counts)
+        logger.info("Dataset counters reconciled: %s", counts)
+        return counts
+
     def get_detailed_stats(self) -> Dict:
-        """Returns detailed statistics about the dataset."""
+        """
+        Returns detailed statistics about the dataset. Counts come from the watched
+        folder listings when the watcher runs and from the counters persisted in the
+        index otherwise (kept current by process_batch); entrada is always listed.
+        """
+        counts = self.index.get_counters()
+        if counts is None:
+            counts = self.reconcile_counters()
+        for key, state in self.folder_states.items():
+            counts[key] = len(state)
+        if "entrada" not in self.folder_states:
+            counts["entrada"] = len(self._list_entrada()) if self.paths["entrada"].exists() else 0
+
         stats = {
             "dataset_base_exists": self.paths["dataset_base_real"].exists() and self.paths["dataset_base_ia"].exists(),
-            "dataset_base_real": 0,
-            "dataset_base_ia": 0,
-            "clasificaciones_real": 0,
-            "clasificaciones_ia": 0,
-            "total_learned": 0
+            "dataset_base_real": counts.get("dataset_base_real", 0),
+            "dataset_base_ia": counts.get("dataset_base_ia", 0),
+            "clasificaciones_real": counts.get("clasificaciones_real", 0),
+            "clasificaciones_ia": counts.get("clasificaciones_ia", 0),
+            "entrada": counts.get("entrada", 0),
+            "entrada_duplicates": self.entrada_duplicate_count(),
         }
-
-        # Count dataset base
-        if self.paths["dataset_base_real"].exists():
-            stats["dataset_base_real"] = sum(1 for _ in self.paths["dataset_base_real"].iterdir() if _.is_file())
-        if self.paths["dataset_base_ia"].exists():
-            stats["dataset_base_ia"] = sum(1 for _ in self.paths["dataset_base_ia"].iterdir() if _.is_file())
-
-        # Count clasificaciones
-        if self.paths["clasificaciones_real"].exists():
-            stats["clasificaciones_real"] = sum(1 for _ in self.paths["clasificaciones_real"].iterdir() if _.is_file())
-        if self.paths["clasificaciones_ia"].exists():
-            stats["clasificaciones_ia"] = sum(1 for _ in self.paths["clasificaciones_ia"].iterdir() if _.is_file())
-
         stats["total_learned"] = (
             stats["dataset_base_real"] + 
             stats["dataset_base_ia"] + 
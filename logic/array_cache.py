@@ -0,0 +1,156 @@
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class ArrayReader:
+    """
+    Read-only view of a ShardedArrayCache's shard files. It holds no database
+    handle and reopens its memory maps lazily, so it can be pickled into
+    DataLoader worker processes.
+    """
+
+    def __init__(self, cache_dir: str, prefix: str, row_shape: Tuple[int, ...], dtype, shard_rows: int):
+        self.cache_dir = Path(cache_dir)
+        self.prefix = prefix
+        self.row_shape = tuple(row_shape)
+        self.dtype = np.dtype(dtype)
+        self.shard_rows = shard_rows
+        self._open = {}
+
+    def shard_path(self, shard: int) -> Path:
+        return self.cache_dir / f"{self.prefix}.{shard:05d}.bin"
+
+    def _shard(self, shard: int, mode: str = "r") -> np.memmap:
+        if mode == "r" and (shard, "r+") in self._open:
+            return self._open[(shard, "r+")]
+        key = (shard, mode)
+        if key not in self._open:
+            self._open[key] = np.memmap(
+                self.shard_path(shard), dtype=self.dtype, mode=mode,
+                shape=(self.shard_rows,) + self.row_shape
+            )
+        return self._open[key]
+
+    def read(self, row: int) -> np.ndarray:
+        return np.array(self._shard(row // self.shard_rows)[row % self.shard_rows])
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_open"] = {}
+        return state
+
+
+class ShardedArrayCache:
+    """
+    Fixed-shape arrays stored per content hash in memory-mapped shard files.
+
+    Each shard holds `shard_rows` rows and is created at full size when first
+    needed; a SQLite table maps hash -> global row. `version` identifies what
+    produced the arrays (e.g. the backbone weights): opening the cache with a
+    different version discards every row.
+    """
+
+    def __init__(self, cache_dir: str, row_shape: Tuple[int, ...], dtype, version: str,
+                 shard_rows: int = 4096, prefix: str = "rows"):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._reader = ArrayReader(str(self.cache_dir), prefix, row_shape, dtype, shard_rows)
+        layout = f"{self._reader.dtype.str}{self._reader.row_shape}x{shard_rows}"
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.cache_dir / f"{prefix}.db"), check_same_thread=False)
+        with self._conn:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS rows (hash TEXT PRIMARY KEY, row INTEGER NOT NULL)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+        stored = dict(self._conn.execute("SELECT key, value FROM meta").fetchall())
+        if stored.get("version") != version or stored.get("layout") != layout:
+            if stored:
+                logger.info("Array cache %s: version changed, discarding cached rows", self.cache_dir.name)
+            with self._conn:
+                self._conn.execute("DELETE FROM rows")
+                self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)", (version,))
+                self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('layout', ?)", (layout,))
+            for shard_file in self.cache_dir.glob(f"{prefix}.*.bin"):
+                shard_file.unlink()
+
+        row = self._conn.execute("SELECT MAX(row) FROM rows").fetchone()[0]
+        self._next_row = 0 if row is None else row + 1
+
+    def _writable_shard(self, shard: int) -> np.memmap:
+        path = self._reader.shard_path(shard)
+        if not path.exists():
+            row_bytes = int(np.prod(self._reader.row_shape)) * self._reader.dtype.itemsize
+            with open(path, "wb") as f:
+                f.truncate(self._reader.shard_rows * row_bytes)
+        return self._reader._shard(shard, mode="r+")
+
+    def get_rows(self, hashes: List[str]) -> Dict[str, int]:
+        """Returns {hash: row} for the hashes that are cached."""
+        found = {}
+        unique = list(set(hashes))
+        with self._lock:
+            for start in range(0, len(unique), 500):
+                chunk = unique[start:start + 500]
+                marks = ",".join("?" * len(chunk))
+                found.update(self._conn.execute(
+                    f"SELECT hash, row FROM rows WHERE hash IN ({marks})", chunk
+                ).fetchall())
+        return found
+
+    def get_many(self, hashes: List[str]) -> Dict[str, np.ndarray]:
+        """Returns {hash: array} for the hashes that are cached."""
+        rows = self.get_rows(hashes)
+        with self._lock:
+            return {h: self._reader.read(row) for h, row in rows.items()}
+
+    def put_many(self, arrays: Dict[str, np.ndarray]) -> Dict[str, int]:
+        """Stores the arrays and returns {hash: row}."""
+        if not arrays:
+            return {}
+        existing = self.get_rows(list(arrays))
+        with self._lock:
+            rows = {}
+            touched = set()
+            for file_hash, array in arrays.items():
+                row = existing.get(file_hash)
+                if row is None:
+                    row = self._next_row
+                    self._next_row += 1
+                shard = row // self._reader.shard_rows
+                self._writable_shard(shard)[row % self._reader.shard_rows] = array
+                touched.add(shard)
+                rows[file_hash] = row
+
+            # Data is on disk before the rows that point to it are committed
+            for shard in touched:
+                self._writable_shard(shard).flush()
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO rows (hash, row) VALUES (?, ?)", list(rows.items())
+                )
+        return rows
+
+    def reader(self) -> ArrayReader:
+        """A fresh read-only view suitable for handing to other processes."""
+        return ArrayReader(str(self._reader.cache_dir), self._reader.prefix, self._reader.row_shape,
+                           self._reader.dtype, self._reader.shard_rows)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM rows").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            for array in self._reader._open.values():
+                if array.mode == "r+":
+                    array.flush()
+            self._reader._open.clear()
+            self._conn.close()
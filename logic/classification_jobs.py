@@ -0,0 +1,128 @@
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ClassificationJob:
+    """
+    Classification of a fixed list of files. Results are appended in chunks as
+    they are computed; readers wait on the job for new ones (results_since).
+    """
+
+    def __init__(self, files: List[str]):
+        self.id = uuid.uuid4().hex
+        self.files = files
+        self.state = "queued"  # queued | running | done | cancelled | error
+        self.error = None
+        self.results = []
+        self.created = time.time()
+        self.finished = None
+        self._cancel = threading.Event()
+        self._cond = threading.Condition()
+
+    @property
+    def finished_state(self) -> bool:
+        return self.state in ("done", "cancelled", "error")
+
+    def cancel(self):
+        """Stops the job before its next chunk. Results already produced are kept."""
+        self._cancel.set()
+        with self._cond:
+            if self.state == "queued":
+                self._finish("cancelled")
+
+    def results_since(self, index: int, timeout: float = 0) -> Tuple[List[Dict], int]:
+        """
+        Returns (results after position `index`, new position). If there are none
+        and the job is still running, waits up to `timeout` seconds for more.
+        """
+        with self._cond:
+            if timeout > 0:
+                self._cond.wait_for(lambda: len(self.results) > index or self.finished_state, timeout=timeout)
+            return self.results[index:], len(self.results)
+
+    def status(self) -> Dict:
+        with self._cond:
+            return {
+                "job_id": self.id,
+                "state": self.state,
+                "total": len(self.files),
+                "done": len(self.results),
+                "error": self.error,
+                "created": self.created,
+                "finished": self.finished,
+            }
+
+    def _add_results(self, results: List[Dict]):
+        with self._cond:
+            self.results.extend(results)
+            self._cond.notify_all()
+
+    def _finish(self, state: str, error: Optional[str] = None):
+        # Caller holds self._cond
+        self.state = state
+        self.error = error
+        self.finished = time.time()
+        self._cond.notify_all()
+
+
+class ClassificationJobManager:
+    """
+    Runs ClassificationJobs on a bounded pool so classifying a large queue never
+    blocks a request thread. classify_fn(files) returns one result dict per file;
+    it is called on chunks of `chunk_size` files, checking for cancellation between
+    chunks. Only the newest `max_finished_jobs` finished jobs are kept.
+    """
+
+    def __init__(self, classify_fn: Callable[[List[str]], List[Dict]], max_workers: int = 1,
+                 chunk_size: int = 32, max_finished_jobs: int = 20):
+        self.classify_fn = classify_fn
+        self.chunk_size = chunk_size
+        self.max_finished_jobs = max_finished_jobs
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="classify-job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def start(self, files: List[str]) -> ClassificationJob:
+        job = ClassificationJob(files)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id: str) -> Optional[ClassificationJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _prune(self):
+        # Caller holds self._lock; dicts keep insertion order, so oldest first
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished_state]
+        for job_id in finished[:max(0, len(finished) - self.max_finished_jobs + 1)]:
+            del self._jobs[job_id]
+
+    def _run(self, job: ClassificationJob):
+        with job._cond:
+            if job.finished_state:  # Cancelled while queued
+                return
+            job.state = "running"
+
+        try:
+            for start in range(0, len(job.files), self.chunk_size):
+                if job._cancel.is_set():
+                    break
+                job._add_results(self.classify_fn(job.files[start:start + self.chunk_size]))
+        except Exception as e:
+            logger.exception("Classification job %s failed: %s", job.id, e)
+            with job._cond:
+                job._finish("error", str(e))
+            return
+
+        with job._cond:
+            job._finish("cancelled" if job._cancel.is_set() else "done")
+        logger.debug("Classification job %s %s: %d/%d files", job.id, job.state, len(job.results), len(job.files))
@@ -0,0 +1,136 @@
+import atexit
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CorrectionLog:
+    """
+    Append-only JSON-Lines log of user corrections (historial_correcciones).
+
+    Actions are buffered in memory and written with a single write+fsync per
+    flush. When the active file grows past `max_bytes` it is rotated into a
+    gzip-compressed segment next to it; iter_entries() streams all segments
+    in chronological order.
+    """
+
+    def __init__(self, log_path: str, legacy_json_path: Optional[str] = None,
+                 flush_every: int = 100, max_bytes: int = 10 * 1024 * 1024):
+        self.log_path = Path(log_path)
+        self.flush_every = flush_every
+        self.max_bytes = max_bytes
+        self._buffer: List[Dict] = []
+        self._lock = threading.Lock()
+
+        self.log_path.parent.mkdir(parents=True, exist_ok=True)
+        if legacy_json_path:
+            self._migrate_from_json(Path(legacy_json_path))
+        self.log_path.touch(exist_ok=True)
+        # Don't lose buffered actions on a normal shutdown
+        atexit.register(self.flush)
+
+    def _migrate_from_json(self, json_path: Path):
+        """Converts the old array-style historial_correcciones.json into JSON Lines, once."""
+        if not json_path.exists():
+            return
+
+        try:
+            with open(json_path, "r") as f:
+                actions = json.load(f)
+        except Exception as e:
+            logger.error("Correction log migration: could not read %s: %s", json_path, e)
+            return
+
+        # Old entries go before anything already in the new log
+        existing = self.log_path.read_bytes() if self.log_path.exists() else b""
+        tmp_path = self.log_path.with_suffix(".jsonl.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write("".join(json.dumps(a) + "\n" for a in actions).encode("utf-8"))
+            f.write(existing)
+            f.flush()
+            os.fsync(f.fileno())
+        tmp_path.replace(self.log_path)
+
+        json_path.rename(json_path.with_suffix(".json.migrated"))
+        logger.info("Correction log migration: converted %d entries from %s", len(actions), json_path)
+
+    def append(self, action: Dict):
+        """Buffers one action. It is written on the next flush (automatic every `flush_every`)."""
+        with self._lock:
+            self._buffer.append(action)
+            should_flush = len(self._buffer) >= self.flush_every
+        if should_flush:
+            self.flush()
+
+    def append_many(self, actions: List[Dict]):
+        """Writes a group of actions with a single fsync."""
+        with self._lock:
+            self._buffer.extend(actions)
+        self.flush()
+
+    def flush(self):
+        with self._lock:
+            if not self._buffer:
+                return
+            data = "".join(json.dumps(a) + "\n" for a in self._buffer).encode("utf-8")
+            with open(self.log_path, "ab") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            self._buffer = []
+
+            if self.log_path.stat().st_size >= self.max_bytes:
+                self._rotate()
+
+    def _rotate(self):
+        """Compresses the active file into a timestamped .gz segment and starts a new one."""
+        segment = self.log_path.with_name(
+            f"{self.log_path.stem}.{time.strftime('%Y%m%d-%H%M%S')}-{int(time.time() * 1000) % 1000:03d}.jsonl.gz"
+        )
+        with open(self.log_path, "rb") as src, gzip.open(segment, "wb") as dst:
+            for chunk in iter(lambda: src.read(1024 * 1024), b""):
+                dst.write(chunk)
+        # Truncate only once the compressed copy is complete
+        open(self.log_path, "wb").close()
+        logger.info("Correction log rotated to %s", segment.name)
+
+    def segments(self) -> List[Path]:
+        """Rotated segments (oldest first) followed by the active file."""
+        rotated = sorted(self.log_path.parent.glob(f"{self.log_path.stem}.*.jsonl.gz"))
+        return rotated + [self.log_path]
+
+    def iter_entries(self, action: Optional[str] = None, since: Optional[float] = None) -> Iterator[Dict]:
+        """
+        Streams logged actions without loading the whole history.
+        Optionally filters by action type and minimum timestamp.
+        """
+        self.flush()
+        for segment in self.segments():
+            if not segment.exists():
+                continue
+            opener = gzip.open if segment.suffix == ".gz" else open
+            with opener(segment, "rt", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Partial last line from an interrupted write
+                        continue
+                    if action is not None and entry.get("action") != action:
+                        continue
+                    if since is not None and entry.get("timestamp", 0) < since:
+                        continue
+                    yield entry
+
+    def close(self):
+        self.flush()
@@ -0,0 +1,278 @@
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class DirectoryState:
+    """
+    In-memory listing of one folder: {name: os.stat_result} of its files, limited
+    to `extensions` (None = every file). Kept current by DirectoryWatcher and by
+    explicit update() calls from the code that writes to the folder.
+    """
+
+    def __init__(self, path: Path, extensions: Optional[Iterable[str]] = None):
+        self.path = Path(path)
+        self.extensions = {e.lower() for e in extensions} if extensions else None
+        self._files = {}
+        self._lock = threading.Lock()
+
+    def accepts(self, name: str) -> bool:
+        return self.extensions is None or os.path.splitext(name)[1].lower() in self.extensions
+
+    def rescan(self) -> List[str]:
+        """Re-lists the folder. Returns the names that are new or changed."""
+        files = {}
+        try:
+            with os.scandir(self.path) as entries:
+                for entry in entries:
+                    if self.accepts(entry.name) and entry.is_file():
+                        try:
+                            files[entry.name] = entry.stat()
+                        except OSError:
+                            continue  # Removed while listing
+        except FileNotFoundError:
+            pass
+        with self._lock:
+            changed = [name for name, st in files.items() if self._changed(self._files.get(name), st)]
+            self._files = files
+        return changed
+
+    def update(self, name: str) -> bool:
+        """Re-stats one file (added, changed or removed). Returns True if it exists and changed."""
+        if not self.accepts(name):
+            return False
+        try:
+            st = os.stat(self.path / name)
+        except OSError:
+            st = None
+        with self._lock:
+            if st is None or not os.path.isfile(self.path / name):
+                self._files.pop(name, None)
+                return False
+            changed = self._changed(self._files.get(name), st)
+            self._files[name] = st
+            return changed
+
+    def remove(self, name: str):
+        with self._lock:
+            self._files.pop(name, None)
+
+    @staticmethod
+    def _changed(old, new) -> bool:
+        return old is None or (old.st_size, old.st_mtime_ns, old.st_ino) != (new.st_size, new.st_mtime_ns, new.st_ino)
+
+    def names(self) -> List[str]:
+        with self._lock:
+            return list(self._files)
+
+    def stats(self) -> Dict[str, os.stat_result]:
+        with self._lock:
+            return dict(self._files)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._files)
+
+    def __contains__(self, name: str) -> bool:
+        with self._lock:
+            return name in self._files
+
+
+class _Inotify:
+    """Minimal Linux inotify binding (ctypes, no dependencies)."""
+
+    IN_CLOSE_WRITE = 0x8
+    IN_MOVED_FROM = 0x40
+    IN_MOVED_TO = 0x80
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    IN_DELETE_SELF = 0x400
+    IN_MOVE_SELF = 0x800
+    IN_Q_OVERFLOW = 0x4000
+    IN_IGNORED = 0x8000
+    IN_ISDIR = 0x40000000
+    IN_CLOEXEC = 0o2000000
+
+    WATCH_MASK = (IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+                  | IN_DELETE_SELF | IN_MOVE_SELF)
+    _HEADER = struct.Struct("iIII")
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(self.IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+    def add_watch(self, path: Path) -> int:
+        wd = self._add_watch(self.fd, os.fsencode(str(path)), self.WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), str(path))
+        return wd
+
+    def read(self, timeout: float):
+        """Yields (wd, mask, name) of pending events, waiting up to `timeout` for the first."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return
+        data = os.read(self.fd, 64 * 1024)
+        offset = 0
+        while offset < len(data):
+            wd, mask, _cookie, length = self._HEADER.unpack_from(data, offset)
+            offset += self._HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            yield wd, mask, os.fsdecode(name)
+
+    def close(self):
+        os.close(self.fd)
+
+
+class DirectoryWatcher:
+    """
+    Keeps a DirectoryState per folder up to date in a background thread.
+
+    backend "inotify" (Linux) applies kernel change events, so a folder is only
+    listed in full at start and after an event queue overflow; "polling" re-lists
+    every folder each `poll_interval` seconds, except `slow_folders` (large folders
+    that change mostly through explicit update() calls), which are re-listed every
+    `slow_poll_interval` seconds; "auto" picks inotify when available.
+    on_change(key, names), if given, is called from the watcher thread with the
+    files of folder `key` that were added or finished writing.
+    """
+
+    def __init__(self, folders: Dict[str, DirectoryState], on_change: Optional[Callable[[str, List[str]], None]] = None,
+                 backend: str = "auto", poll_interval: float = 2.0,
+                 slow_folders: Iterable[str] = (), slow_poll_interval: float = 300.0):
+        if backend not in ("auto", "inotify", "polling"):
+            raise ValueError(f"Unknown watcher backend: {backend}")
+        self.folders = folders
+        self.on_change = on_change
+        self.poll_interval = poll_interval
+        self.slow_folders = set(slow_folders)
+        self.slow_poll_interval = slow_poll_interval
+        self._last_slow_poll = 0.0
+        self.backend = backend
+        self._inotify = None
+        self._watches = {}  # wd -> folder key
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Lists every folder, then starts watching them."""
+        if self.backend in ("auto", "inotify") and sys.platform.startswith("linux"):
+            try:
+                self._inotify = _Inotify()
+            except (OSError, AttributeError) as e:
+                logger.warning("inotify unavailable (%s), polling every %.1f s", e, self.poll_interval)
+        if self._inotify is None and self.backend == "inotify":
+            logger.warning("inotify is only available on Linux; polling every %.1f s", self.poll_interval)
+        self.backend = "inotify" if self._inotify else "polling"
+
+        # Watches go in before the listing, so nothing created in between is missed
+        if self._inotify:
+            self._add_watches()
+        for state in self.folders.values():
+            state.rescan()
+        self._last_slow_poll = time.monotonic()
+
+        self._thread = threading.Thread(target=self._run, name="directory-watcher", daemon=True)
+        self._thread.start()
+        if self.backend == "polling" and self.slow_folders:
+            logger.info("Watching %d folders (polling every %.1f s; %s every %.0f s)", len(self.folders),
+                        self.poll_interval, ", ".join(sorted(self.slow_folders)), self.slow_poll_interval)
+        else:
+            logger.info("Watching %d folders (%s)", len(self.folders), self.backend)
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        if self._inotify:
+            self._inotify.close()
+
+    def _add_watches(self):
+        self._watches = {}
+        for key, state in self.folders.items():
+            try:
+                self._watches[self._inotify.add_watch(state.path)] = key
+            except OSError as e:
+                logger.warning("Cannot watch %s: %s", state.path, e)
+
+    def _notify(self, changes: Dict[str, Set[str]]):
+        if not self.on_change:
+            return
+        for key, names in changes.items():
+            if names:
+                try:
+                    self.on_change(key, sorted(names))
+                except Exception as e:
+                    logger.exception("Directory change handler failed for %s: %s", key, e)
+
+    def _full_rescan(self) -> Dict[str, Set[str]]:
+        return {key: set(state.rescan()) for key, state in self.folders.items()}
+
+    def _poll(self) -> Dict[str, Set[str]]:
+        now = time.monotonic()
+        slow_due = now - self._last_slow_poll >= self.slow_poll_interval
+        if slow_due:
+            self._last_slow_poll = now
+        return {key: set(state.rescan()) for key, state in self.folders.items()
+                if slow_due or key not in self.slow_folders}
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if self._inotify:
+                    self._notify(self._read_events())
+                else:
+                    self._stop.wait(self.poll_interval)
+                    self._notify(self._poll())
+            except Exception as e:
+                logger.exception("Directory watcher error: %s", e)
+                self._stop.wait(self.poll_interval)
+
+    def _read_events(self) -> Dict[str, Set[str]]:
+        changes = {}
+        rescan = False
+        for wd, mask, name in self._inotify.read(timeout=1.0):
+            if mask & _Inotify.IN_Q_OVERFLOW:
+                logger.warning("Directory watcher queue overflow; relisting folders")
+                rescan = True
+                continue
+            key = self._watches.get(wd)
+            if key is None:
+                continue
+            if mask & (_Inotify.IN_DELETE_SELF | _Inotify.IN_MOVE_SELF | _Inotify.IN_IGNORED):
+                # The folder itself went away (or was replaced): start over
+                rescan = True
+                continue
+            if mask & _Inotify.IN_ISDIR or not name:
+                continue
+
+            state = self.folders[key]
+            if mask & (_Inotify.IN_DELETE | _Inotify.IN_MOVED_FROM):
+                state.remove(name)
+            elif mask & _Inotify.IN_CREATE:
+                # Listed right away; reported once it is complete (IN_CLOSE_WRITE)
+                state.update(name)
+            elif state.update(name) or mask & _Inotify.IN_CLOSE_WRITE:
+                changes.setdefault(key, set()).add(name)
+
+        if rescan:
+            self._add_watches()
+            for key, names in self._full_rescan().items():
+                changes.setdefault(key, set()).update(names)
+        return changes
@@ -0,0 +1,16 @@
+import numpy as np
+
+from array_cache import ShardedArrayCache
+
+
+class FeatureCache(ShardedArrayCache):
+    """
+    Penultimate-layer embeddings stored per image content hash, in memory-mapped
+    float32 shards. The cache belongs to one backbone: if it is opened with a
+    different `backbone_id` every row is discarded.
+    """
+
+    def __init__(self, cache_dir: str, backbone_id: str, dim: int = 512):
+        super().__init__(cache_dir, (dim,), np.float32, version=backbone_id,
+                         shard_rows=16384, prefix="features")
+        self.dim = dim
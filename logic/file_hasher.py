@@ -0,0 +1,111 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Union
+
+
+class FileHasher:
+    """
+    Content hashing with a fixed-size read buffer and a stat-keyed cache.
+
+    Files are read in `chunk_size` pieces into a reused buffer, so memory use
+    doesn't depend on file size. Results are cached by (device, inode, size,
+    mtime_ns): an unchanged file (including one moved within the same disk,
+    which keeps its inode) is never read twice.
+    """
+
+    ALGORITHMS = ("md5", "blake2b", "sha256")
+
+    def __init__(self, algorithm: str = "md5", chunk_size: int = 1024 * 1024, max_cache_entries: int = 200000):
+        if algorithm not in self.ALGORITHMS:
+            raise ValueError(f"Unknown hash algorithm: {algorithm}")
+        self.algorithm = algorithm
+        self.chunk_size = chunk_size
+        self.max_cache_entries = max_cache_entries
+        self._cache = OrderedDict()
+        self._phash_cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _new_hasher(self):
+        if self.algorithm == "blake2b":
+            # 32-byte digest: same hex length as sha256, faster than md5 on 64-bit CPUs
+            return hashlib.blake2b(digest_size=32)
+        return hashlib.new(self.algorithm)
+
+    def hash_file(self, file_path: Union[str, Path]) -> str:
+        """Hashes the file contents, bypassing the cache."""
+        hasher = self._new_hasher()
+        buf = bytearray(self.chunk_size)
+        view = memoryview(buf)
+        with open(file_path, "rb", buffering=0) as f:
+            while True:
+                n = f.readinto(buf)
+                if not n:
+                    break
+                hasher.update(view[:n])
+        return hasher.hexdigest()
+
+    @staticmethod
+    def _stat_key(file_path: Union[str, Path]) -> tuple:
+        st = os.stat(file_path)
+        key = (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+        if not st.st_ino:
+            # Some network/FAT filesystems report no inode: fall back to the path
+            key += (os.path.abspath(file_path),)
+        return key
+
+    def _cached(self, cache: OrderedDict, file_path: Union[str, Path], compute) -> str:
+        key = self._stat_key(file_path)
+
+        with self._lock:
+            cached = cache.get(key)
+            if cached is not None:
+                cache.move_to_end(key)
+                return cached
+
+        value = compute(file_path)
+
+        with self._lock:
+            cache[key] = value
+            if len(cache) > self.max_cache_entries:
+                cache.popitem(last=False)
+        return value
+
+    def hash(self, file_path: Union[str, Path]) -> str:
+        """Returns the content hash, reusing the cached value if the file is unchanged."""
+        return self._cached(self._cache, file_path, self.hash_file)
+
+    def perceptual_hash(self, file_path: Union[str, Path]) -> str:
+        """64-bit difference hash (dHash) as 16 hex chars, cached like hash()."""
+        return self._cached(self._phash_cache, file_path, dhash)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self._phash_cache.clear()
+
+
+def dhash(file_path: Union[str, Path]) -> str:
+    """
+    Difference hash: compares neighbouring pixels of a 9x8 grayscale thumbnail.
+    Re-encoded or slightly resized copies of an image land within a few bits.
+    """
+    from PIL import Image
+
+    with Image.open(file_path) as image:
+        image.draft("L", (64, 64))  # Let JPEG decode at reduced size
+        pixels = list(image.convert("L").resize((9, 8), Image.BILINEAR).getdata())
+
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            right = pixels[row * 9 + col + 1]
+            value = (value << 1) | (1 if left > right else 0)
+    return f"{value:016x}"
+
+
+def hamming_distance(hash_a: str, hash_b: str) -> int:
+    return bin(int(hash_a, 16) ^ int(hash_b, 16)).count("1")
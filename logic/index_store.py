@@ -0,0 +1,304 @@
+import json
+import logging
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class IndexStore(ABC):
+    """
+    Storage backend for the dataset index: {file_hash: entry}.
+    Entries are dicts with at least 'path', 'label', 'origin', 'timestamp' and 'hash'.
+    Backends implement every abstract method; put, __contains__ and close have defaults.
+    """
+
+    @abstractmethod
+    def get(self, file_hash: str) -> Optional[Dict]:
+        ...
+
+    def put(self, file_hash: str, entry: Dict):
+        self.put_many({file_hash: entry})
+
+    @abstractmethod
+    def put_many(self, entries: Dict[str, Dict], counter_deltas: Optional[Dict[str, int]] = None):
+        """
+        Writes all entries at once (a single transaction where supported), together
+        with `counter_deltas` for add_counters.
+        """
+
+    @abstractmethod
+    def delete_many(self, hashes: List[str]):
+        ...
+
+    @abstractmethod
+    def query_by_label(self, label: str) -> List[Dict]:
+        ...
+
+    @abstractmethod
+    def count_by_label(self) -> Dict[str, int]:
+        ...
+
+    @abstractmethod
+    def query_since(self, timestamp: float, limit: Optional[int] = None) -> List[Dict]:
+        """Entries with timestamp > `timestamp`, oldest first (at most `limit`)."""
+
+    @abstractmethod
+    def items(self) -> Iterator[Tuple[str, Dict]]:
+        ...
+
+    @abstractmethod
+    def get_counters(self) -> Optional[Dict[str, int]]:
+        """Persisted counters ({name: value}), None until set_counters is first called."""
+
+    @abstractmethod
+    def set_counters(self, values: Dict[str, int]):
+        """Replaces every counter (used to rebuild them from disk)."""
+
+    @abstractmethod
+    def add_counters(self, deltas: Dict[str, int]):
+        """Adds to existing counters; a no-op before set_counters, so no count starts from a wrong base."""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+    def __contains__(self, file_hash: str) -> bool:
+        return self.get(file_hash) is not None
+
+    def close(self):
+        pass
+
+
+class JsonIndexStore(IndexStore):
+    """Legacy backend: the whole index lives in one JSON file, rewritten on every write."""
+
+    def __init__(self, json_path: str):
+        self.json_path = Path(json_path)
+        # Counters go to a side file: the index file itself is {hash: entry}
+        self.counters_path = self.json_path.with_suffix(".counters.json")
+        self._lock = threading.Lock()
+        if not self.json_path.exists():
+            self._write({})
+
+    def _read(self) -> Dict:
+        with open(self.json_path, "r") as f:
+            return json.load(f)
+
+    def _write(self, data: Dict, path: Optional[Path] = None):
+        # Write to a temp file and rename so a crash never leaves a half-written index
+        path = path or self.json_path
+        tmp_path = path.with_suffix(".json.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=4)
+        tmp_path.replace(path)
+
+    def get(self, file_hash: str) -> Optional[Dict]:
+        return self._read().get(file_hash)
+
+    def put_many(self, entries: Dict[str, Dict], counter_deltas: Optional[Dict[str, int]] = None):
+        if entries:
+            with self._lock:
+                data = self._read()
+                data.update(entries)
+                self._write(data)
+        if counter_deltas:
+            # Two files, so not atomic with the entries; reconcile repairs a crash in between
+            self.add_counters(counter_deltas)
+
+    def delete_many(self, hashes: List[str]):
+        with self._lock:
+            data = self._read()
+            for file_hash in hashes:
+                data.pop(file_hash, None)
+            self._write(data)
+
+    def query_by_label(self, label: str) -> List[Dict]:
+        return [v for v in self._read().values() if v.get("label") == label]
+
+    def count_by_label(self) -> Dict[str, int]:
+        counts = {}
+        for v in self._read().values():
+            counts[v.get("label")] = counts.get(v.get("label"), 0) + 1
+        return counts
+
+    def query_since(self, timestamp: float, limit: Optional[int] = None) -> List[Dict]:
+        entries = [v for v in self._read().values() if v.get("timestamp", 0) > timestamp]
+        entries.sort(key=lambda v: v.get("timestamp", 0))
+        return entries[:limit] if limit is not None else entries
+
+    def items(self) -> Iterator[Tuple[str, Dict]]:
+        return iter(self._read().items())
+
+    def get_counters(self) -> Optional[Dict[str, int]]:
+        try:
+            with open(self.counters_path, "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def set_counters(self, values: Dict[str, int]):
+        with self._lock:
+            self._write(dict(values), self.counters_path)
+
+    def add_counters(self, deltas: Dict[str, int]):
+        with self._lock:
+            counters = self.get_counters()
+            if counters is None:
+                return
+            for name, delta in deltas.items():
+                # Like the SQLite backend: counters that were never set stay unset
+                if name in counters:
+                    counters[name] += delta
+            self._write(counters, self.counters_path)
+
+    def __len__(self) -> int:
+        return len(self._read())
+
+
+class SqliteIndexStore(IndexStore):
+    """
+    SQLite backend (WAL mode). Label and timestamp are real columns with indexes,
+    the full entry is kept as JSON so extra fields survive round trips.
+    """
+
+    def __init__(self, db_path: str, legacy_json_path: Optional[str] = None):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    hash TEXT PRIMARY KEY,
+                    label TEXT,
+                    timestamp REAL,
+                    data TEXT NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_label ON entries (label)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_timestamp ON entries (timestamp)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+
+        if legacy_json_path:
+            self._migrate_from_json(Path(legacy_json_path))
+
+    def _migrate_from_json(self, json_path: Path):
+        """One-time import of the old dataset_index.json. The JSON file is left untouched."""
+        if self._get_meta("migrated_from_json") or not json_path.exists():
+            return
+
+        try:
+            with open(json_path, "r") as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.error("Index migration: could not read %s: %s", json_path, e)
+            return
+
+        self.put_many(data)
+        self._set_meta("migrated_from_json", str(json_path))
+        logger.info("Index migration: imported %d entries from %s", len(data), json_path)
+
+    def _get_meta(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value: str):
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def get(self, file_hash: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM entries WHERE hash = ?", (file_hash,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_many(self, entries: Dict[str, Dict], counter_deltas: Optional[Dict[str, int]] = None):
+        if not entries and not counter_deltas:
+            return
+        rows = [
+            (file_hash, entry.get("label"), entry.get("timestamp"), json.dumps(entry))
+            for file_hash, entry in entries.items()
+        ]
+        # One transaction: entries and counters are never out of step
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO entries (hash, label, timestamp, data) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            if counter_deltas:
+                self._add_counters(counter_deltas)
+
+    def delete_many(self, hashes: List[str]):
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM entries WHERE hash = ?", [(h,) for h in hashes])
+
+    def query_by_label(self, label: str) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute("SELECT data FROM entries WHERE label = ?", (label,)).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def count_by_label(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT label, COUNT(*) FROM entries GROUP BY label").fetchall()
+        return {label: count for label, count in rows}
+
+    def query_since(self, timestamp: float, limit: Optional[int] = None) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT data FROM entries WHERE timestamp > ? ORDER BY timestamp ASC LIMIT ?",
+                (timestamp, -1 if limit is None else limit)
+            ).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def items(self) -> Iterator[Tuple[str, Dict]]:
+        with self._lock:
+            rows = self._conn.execute("SELECT hash, data FROM entries").fetchall()
+        return ((h, json.loads(d)) for h, d in rows)
+
+    def get_counters(self) -> Optional[Dict[str, int]]:
+        if not self._get_meta("counters_initialized"):
+            return None
+        with self._lock:
+            rows = self._conn.execute("SELECT name, value FROM counters").fetchall()
+        return {name: value for name, value in rows}
+
+    def set_counters(self, values: Dict[str, int]):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM counters")
+            self._conn.executemany("INSERT INTO counters (name, value) VALUES (?, ?)", list(values.items()))
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('counters_initialized', '1')")
+
+    def add_counters(self, deltas: Dict[str, int]):
+        with self._lock, self._conn:
+            self._add_counters(deltas)
+
+    def _add_counters(self, deltas: Dict[str, int]):
+        # Caller holds self._lock inside a transaction. UPDATE only: counters that
+        # were never set stay unset until set_counters
+        self._conn.executemany("UPDATE counters SET value = value + ? WHERE name = ?",
+                               [(delta, name) for name, delta in deltas.items()])
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def open_index_store(backend: str, json_path: Path, db_path: Path) -> IndexStore:
+    """Creates the index backend: 'sqlite' (default, migrates the JSON once) or 'json'."""
+    if backend == "json":
+        return JsonIndexStore(str(json_path))
+    if backend == "sqlite":
+        return SqliteIndexStore(str(db_path), legacy_json_path=str(json_path))
+    raise ValueError(f"Unknown index backend: {backend}")
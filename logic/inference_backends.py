@@ -0,0 +1,193 @@
+import copy
+import logging
+from pathlib import Path
+from typing import Callable, Dict
+
+import torch
+import torch.nn as nn
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceBackend:
+    """
+    Runs the forward pass of a trained model: batch (N, 3, 224, 224) -> logits (N, 2).
+    Subclasses convert a copy of the eager model once in build(); the eager model
+    itself is never modified, since training keeps copying it.
+    """
+
+    name = "eager"
+
+    def __init__(self, model: nn.Module, device: torch.device, **options):
+        self.model = model
+        self.device = device
+        self.options = options
+
+    def build(self, example: torch.Tensor):
+        """Prepares the backend. `example` is a representative input batch."""
+
+    def __call__(self, batch: torch.Tensor) -> torch.Tensor:
+        with torch.no_grad():
+            return self.model(batch)
+
+
+class ChannelsLastBackend(InferenceBackend):
+    """NHWC memory layout: faster convolutions on CPUs with oneDNN."""
+
+    name = "channels_last"
+
+    def build(self, example: torch.Tensor):
+        self.model = copy.deepcopy(self.model).to(memory_format=torch.channels_last).eval()
+
+    def __call__(self, batch: torch.Tensor) -> torch.Tensor:
+        with torch.no_grad():
+            return self.model(batch.contiguous(memory_format=torch.channels_last))
+
+
+class TorchScriptBackend(InferenceBackend):
+    """Traced, frozen and optimized TorchScript graph (constant folding, conv+bn fusion)."""
+
+    name = "torchscript"
+
+    def build(self, example: torch.Tensor):
+        with torch.no_grad():
+            traced = torch.jit.trace(copy.deepcopy(self.model).eval(), example)
+            self.model = torch.jit.optimize_for_inference(torch.jit.freeze(traced))
+
+
+class CompileBackend(InferenceBackend):
+    """torch.compile (needs a working C++ compiler for the default inductor backend)."""
+
+    name = "compile"
+
+    def build(self, example: torch.Tensor):
+        self.model = torch.compile(copy.deepcopy(self.model).eval(), dynamic=True)
+        # The first call compiles; do it now rather than in a user request
+        self(example)
+
+
+class Int8DynamicBackend(InferenceBackend):
+    """
+    Dynamic int8 quantization. Only Linear layers are quantized, so for a ResNet
+    this mostly shrinks the head; it needs no calibration data.
+    """
+
+    name = "int8_dynamic"
+
+    def build(self, example: torch.Tensor):
+        self.model = torch.ao.quantization.quantize_dynamic(
+            copy.deepcopy(self.model).cpu().eval(), {nn.Linear}, dtype=torch.qint8
+        )
+
+    def __call__(self, batch: torch.Tensor) -> torch.Tensor:
+        with torch.no_grad():
+            return self.model(batch.cpu())
+
+
+class Int8StaticBackend(InferenceBackend):
+    """
+    Static int8 quantization of the whole network (FX graph mode), calibrated on
+    `example`: convolutions run as int8 kernels (fbgemm/x86). Best used with a
+    calibration batch of real images.
+    """
+
+    name = "int8_static"
+
+    def build(self, example: torch.Tensor):
+        from torch.ao.quantization import get_default_qconfig_mapping
+        from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+
+        model = copy.deepcopy(self.model).cpu().eval()
+        example = example.cpu()
+        prepared = prepare_fx(model, get_default_qconfig_mapping(), example_inputs=(example[:1],))
+        with torch.no_grad():
+            for start in range(0, len(example), 16):
+                prepared(example[start:start + 16])
+        self.model = convert_fx(prepared)
+
+    def __call__(self, batch: torch.Tensor) -> torch.Tensor:
+        with torch.no_grad():
+            return self.model(batch.cpu())
+
+
+class OnnxRuntimeBackend(InferenceBackend):
+    """Exports the model to ONNX (`onnx_path`) and serves it with ONNX Runtime (CPU)."""
+
+    name = "onnxruntime"
+
+    def __init__(self, model: nn.Module, device: torch.device, **options):
+        super().__init__(model, device, **options)
+        self.onnx_path = Path(options.get("onnx_path") or "model.onnx")
+        self.session = None
+
+    def build(self, example: torch.Tensor):
+        import onnxruntime
+
+        model = copy.deepcopy(self.model).cpu().eval()
+        options = dict(input_names=["input"], output_names=["logits"],
+                       dynamic_axes={"input": {0: "batch"}, "logits": {0: "batch"}})
+        self.onnx_path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            torch.onnx.export(model, (example[:1].cpu(),), str(self.onnx_path), dynamo=False, **options)
+        except TypeError:
+            # torch versions before the `dynamo` argument
+            torch.onnx.export(model, (example[:1].cpu(),), str(self.onnx_path), **options)
+        self.session = onnxruntime.InferenceSession(str(self.onnx_path), providers=["CPUExecutionProvider"])
+
+    def __call__(self, batch: torch.Tensor) -> torch.Tensor:
+        outputs = self.session.run(["logits"], {"input": batch.cpu().numpy()})[0]
+        return torch.from_numpy(outputs)
+
+
+BACKENDS: Dict[str, Callable[..., InferenceBackend]] = {
+    backend.name: backend for backend in (
+        InferenceBackend, ChannelsLastBackend, TorchScriptBackend, CompileBackend,
+        Int8DynamicBackend, Int8StaticBackend, OnnxRuntimeBackend,
+    )
+}
+
+# Max difference in softmax probability vs eager accepted when validating a backend
+TOLERANCES = {"int8_dynamic": 0.05, "int8_static": 0.1}
+DEFAULT_TOLERANCE = 1e-3
+
+
+def compare_outputs(reference: torch.Tensor, outputs: torch.Tensor) -> Dict:
+    """Max softmax-probability difference and top-1 agreement of two logit batches."""
+    ref_probs = torch.softmax(reference.float().cpu(), dim=1)
+    probs = torch.softmax(outputs.float().cpu(), dim=1)
+    return {
+        "max_prob_diff": float((ref_probs - probs).abs().max()),
+        "top1_agreement": float((ref_probs.argmax(1) == probs.argmax(1)).float().mean()),
+    }
+
+
+def create_backend(name: str, model: nn.Module, device: torch.device, example: torch.Tensor,
+                   **options) -> InferenceBackend:
+    """
+    Builds backend `name` for `model` and checks it against eager on `example`.
+    If the backend is unavailable (e.g. onnxruntime not installed), fails to build,
+    or differs from eager by more than its tolerance, the eager backend is returned.
+    """
+    eager = InferenceBackend(model, device, **options)
+    if name == eager.name:
+        return eager
+    if name not in BACKENDS:
+        logger.warning("Unknown inference backend %r, using eager", name)
+        return eager
+
+    try:
+        backend = BACKENDS[name](model, device, **options)
+        backend.build(example)
+        report = compare_outputs(eager(example), backend(example))
+    except Exception as e:
+        logger.warning("Inference backend %s unavailable (%s), using eager", name, e)
+        return eager
+
+    tolerance = TOLERANCES.get(name, DEFAULT_TOLERANCE)
+    if report["max_prob_diff"] > tolerance:
+        logger.warning("Inference backend %s differs from eager (%s > %s), using eager",
+                       name, report, tolerance)
+        return eager
+
+    logger.info("Inference backend %s validated against eager: %s", name, report)
+    return backend
@@ -0,0 +1,62 @@
+import atexit
+import logging
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener
+from typing import Callable, Dict, Optional
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """
+    Puts the record on the queue as-is. The stock QueueHandler formats the message
+    in the calling thread; here formatting happens in the listener thread instead.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class CallbackHandler(logging.Handler):
+    """Hands every formatted record to sink(message, level, created)."""
+
+    def __init__(self, sink: Callable[[str, str, float], None]):
+        super().__init__()
+        self.sink = sink
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            self.sink(self.format(record), record.levelname, record.created)
+        except Exception:
+            self.handleError(record)
+
+
+def setup_logging(sink: Callable[[str, str, float], None], level: str = "INFO",
+                  module_levels: Optional[Dict[str, str]] = None, console: bool = True) -> QueueListener:
+    """
+    Routes the `logging` module through a queue: callers only pay for the level
+    check and a queue put, while formatting, the in-memory buffer (`sink`) and the
+    console output run in the listener thread.
+
+    module_levels overrides the level per logger name, e.g. {"data_manager": "DEBUG"}.
+    Returns the started listener; it is stopped (and drained) at exit.
+    """
+    handlers = [CallbackHandler(sink)]
+    # Windowed (frozen) builds have no console
+    if console and sys.stderr is not None:
+        stream = logging.StreamHandler(sys.stderr)
+        stream.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s", "%H:%M:%S"))
+        handlers.append(stream)
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.handlers = [_DeferredQueueHandler(log_queue)]
+    root.setLevel(level)
+    for name, module_level in (module_levels or {}).items():
+        logging.getLogger(name).setLevel(module_level)
+    # warnings.warn (torch, PIL...) becomes records of the "py.warnings" logger
+    logging.captureWarnings(True)
+
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
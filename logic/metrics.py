@@ -0,0 +1,176 @@
+import bisect
+import cProfile
+import io
+import logging
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the histogram buckets: from sub-millisecond hashes of
+# cached files up to full training runs
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+
+def _label_key(labels: Dict[str, str]) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: Tuple[Tuple[str, str], ...], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+class _Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)  # Not cumulative; summed when rendering
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        i = bisect.bisect_left(self.buckets, value)
+        if i < len(self.buckets):
+            self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+
+
+class MetricsRegistry:
+    """
+    In-process counters, gauges and histograms rendered in the Prometheus text
+    format (no client library needed). Every metric is created on first use;
+    `describe` only adds its HELP line. Thread-safe: observations take one lock.
+    """
+
+    def __init__(self, prefix: str = "clasificador_", buckets=DEFAULT_BUCKETS):
+        self.prefix = prefix
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._help = {}
+        self._types = {}
+        self._values = {}  # name -> {label key: float or _Histogram}
+
+    def describe(self, name: str, help_text: str):
+        self._help[name] = help_text
+
+    def _series(self, name: str, kind: str) -> Dict:
+        # Caller holds self._lock
+        known = self._types.setdefault(name, kind)
+        if known != kind:
+            raise ValueError(f"Metric {name} is a {known}, not a {kind}")
+        return self._values.setdefault(name, {})
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series(name, "counter")
+            series[key] = series.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels):
+        with self._lock:
+            self._series(name, "gauge")[_label_key(labels)] = value
+
+    def observe(self, name: str, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series(name, "histogram")
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _Histogram(self.buckets)
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """Observes the seconds spent in the `with` block (also when it raises)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def render(self) -> str:
+        """Every metric in the Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        with self._lock:
+            for name in sorted(self._values):
+                full_name = self.prefix + name
+                kind = self._types[name]
+                if name in self._help:
+                    lines.append(f"# HELP {full_name} {self._help[name]}")
+                lines.append(f"# TYPE {full_name} {kind}")
+                for key, value in sorted(self._values[name].items()):
+                    if kind != "histogram":
+                        lines.append(f"{full_name}{_format_labels(key)} {value}")
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(value.buckets, value.counts):
+                        cumulative += count
+                        lines.append(f"{full_name}_bucket{_format_labels(key, ('le', repr(bound)))} {cumulative}")
+                    lines.append(f"{full_name}_bucket{_format_labels(key, ('le', '+Inf'))} {value.count}")
+                    lines.append(f"{full_name}_sum{_format_labels(key)} {value.sum}")
+                    lines.append(f"{full_name}_count{_format_labels(key)} {value.count}")
+        return "\n".join(lines) + "\n"
+
+
+# Shared by every module of the process
+metrics = MetricsRegistry()
+metrics.describe("stage_seconds", "Time per pipeline stage (decode, transform, forward, hash, move, index I/O)")
+metrics.describe("operation_seconds", "Time per high-level operation (predict_batch, scan_entrada, entrada_page, process_batch, train)")
+metrics.describe("request_seconds", "HTTP request time per endpoint")
+metrics.describe("predictions_total", "Predictions served, by source (cache or model)")
+metrics.describe("images_processed_total", "Images moved out of entrada by process_batch, by result")
+metrics.describe("training_images_total", "Images seen by training, counted once per epoch")
+metrics.describe("model_ready", "1 once the model is loaded and serving predictions")
+
+
+class RequestProfiler:
+    """
+    cProfile for a single request. Stats go to <output_dir>/<time>_<name>.prof,
+    readable with pstats or snakeviz, and the top functions are logged. Only the
+    thread that handles the request is profiled (not the inference worker); use
+    `py-spy record --pid <pid>` for a whole-process sampling profile.
+    Only one request is profiled at a time.
+    """
+
+    def __init__(self, output_dir: str, top: int = 25):
+        self.output_dir = Path(output_dir)
+        self.top = top
+        self._busy = threading.Lock()
+
+    def start(self) -> Optional[cProfile.Profile]:
+        """Starts profiling the calling thread; None if another request is being profiled."""
+        if not self._busy.acquire(blocking=False):
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler (e.g. a debugger) is already active
+            self._busy.release()
+            return None
+        return profiler
+
+    def stop(self, profiler: cProfile.Profile, name: str) -> Path:
+        """Stops `profiler`, writes its stats and returns the .prof path."""
+        try:
+            profiler.disable()
+            self.output_dir.mkdir(parents=True, exist_ok=True)
+            safe_name = "".join(c if c.isalnum() else "_" for c in name).strip("_") or "request"
+            path = self.output_dir / f"{time.strftime('%Y%m%d_%H%M%S')}_{safe_name}.prof"
+            profiler.dump_stats(str(path))
+
+            summary = io.StringIO()
+            pstats.Stats(profiler, stream=summary).sort_stats("cumulative").print_stats(self.top)
+            logger.info("Profile of %s saved to %s\n%s", name, path, summary.getvalue())
+            return path
+        finally:
+            self._busy.release()
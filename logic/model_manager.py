@@ -4,68 +4,348 @@ import torch.optim as optim
 from torchvision import models, transforms, datasets
 from torch.utils.data import DataLoader, Dataset
 from PIL import Image
+import numpy as np
 import os
+import copy
+import hashlib
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Dict
+from typing import Callable, List, Dict, Optional
+
+from prediction_cache import PredictionCache
+from feature_cache import FeatureCache
+from array_cache import ShardedArrayCache
+from inference_backends import InferenceBackend, create_backend
+from file_hasher import FileHasher
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
 
 class CustomDataset(Dataset):
-    def __init__(self, file_list, labels, transform=None):
+    def __init__(self, file_list, labels, transform=None, tensor_rows=None, tensor_reader=None, normalize=None):
+        """
+        tensor_rows/tensor_reader: optional rows of pre-resized uint8 images in a
+        ShardedArrayCache (None for files that aren't cached). Cached items skip the
+        decode and only get `normalize`; the rest go through `transform`.
+        """
         self.file_list = file_list
         self.labels = labels
         self.transform = transform
+        self.tensor_rows = tensor_rows
+        self.tensor_reader = tensor_reader
+        self.normalize = normalize
 
     def __len__(self):
         return len(self.file_list)
 
     def __getitem__(self, idx):
+        label = self.labels[idx]
+        row = self.tensor_rows[idx] if self.tensor_rows is not None else None
+        if row is not None:
+            # Same values ToTensor() would produce from the resized image
+            image = torch.from_numpy(self.tensor_reader.read(row)).float().div_(255)
+            if self.normalize:
+                image = self.normalize(image)
+            return image, label
+
         img_path = self.file_list[idx]
         image = Image.open(img_path).convert("RGB")
-        label = self.labels[idx]
         if self.transform:
             image = self.transform(image)
         return image, label
 
 class ModelManager:
-    def __init__(self, model_path: str):
+    def __init__(self, model_path: str, cache_path: Optional[str] = None,
+                 feature_cache_dir: Optional[str] = None, hash_fn: Optional[Callable[[str], str]] = None,
+                 tensor_cache_dir: Optional[str] = None, loader_workers: int = 0, loader_prefetch: int = 2,
+                 inference_backend: str = "eager", calibration_files: Optional[List[str]] = None,
+                 inference_threads: Optional[int] = None, train_threads: Optional[int] = None,
+                 interop_threads: Optional[int] = None):
+        """
+        feature_cache_dir enables head-only mode: the backbone is frozen, its 512-d
+        embeddings are cached per image hash and training only updates `fc`.
+        hash_fn must produce the same hashes passed to predict_batch (DataManager.get_file_hash).
+        tensor_cache_dir stores every training image once as a resized 224x224 uint8
+        array, so later epochs and runs skip the decode.
+        loader_workers/loader_prefetch configure the training DataLoader
+        (worker processes are kept alive across epochs).
+        inference_backend selects how predictions run (see inference_backends.BACKENDS:
+        eager, channels_last, torchscript, compile, int8_dynamic, int8_static, onnxruntime).
+        It is rebuilt for every new checkpoint and validated against eager on up to 64
+        of `calibration_files`; anything that fails or disagrees falls back to eager.
+        Every inference forward pass runs on one dedicated worker thread, so concurrent
+        callers queue instead of oversubscribing the CPU. inference_threads and
+        train_threads are the torch intra-op thread counts used for inference and for
+        training (None: torch default). With the OpenMP backend of the standard builds
+        that count belongs to the calling thread, so the inference worker and the
+        training thread each keep their own budget. Builds with a process-wide pool
+        (TBB or native) share one count; each side therefore sets its own before it
+        runs (see _use_threads) and, while training overlaps predictions, they take
+        turns at their budgets there instead.
+        interop_threads is process-wide and only takes effect before torch starts any
+        inter-op work.
+        """
         self.model_path = Path(model_path)
+        # Identifies the weights that produced a prediction (see _compute_fingerprint)
+        self.fingerprint = None
+        # Index timestamp of the newest sample the saved weights were trained on
+        self.trained_until = 0.0
+        self.prediction_cache = PredictionCache(cache_path) if cache_path else None
+        # Guards the (model, backend, fingerprint) triple swapped in after training
+        self._swap_lock = threading.Lock()
+        # Only one training run at a time
+        self._train_lock = threading.Lock()
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-        self.transform = transforms.Compose([
-            transforms.Resize((224, 224)),
-            transforms.ToTensor(),
-            transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225]),
-        ])
+        self.inference_threads = inference_threads
+        self.train_threads = train_threads
+        if interop_threads:
+            try:
+                torch.set_num_interop_threads(interop_threads)
+            except RuntimeError as e:
+                logger.warning("Could not set inter-op threads to %d: %s", interop_threads, e)
+        self._inference_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
+        self.resize = transforms.Resize((224, 224))
+        self.normalize = transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
+        self.transform = transforms.Compose([self.resize, transforms.ToTensor(), self.normalize])
         self.model = self._load_model()
+        self.loader_workers = loader_workers
+        self.loader_prefetch = loader_prefetch
+
+        self.head_only = feature_cache_dir is not None
+        self.hash_fn = hash_fn or FileHasher().hash
+        self.feature_cache = None
+        if self.head_only:
+            self.feature_cache = FeatureCache(
+                feature_cache_dir, self._backbone_id(self.model), dim=self.model.fc.in_features
+            )
+        self.tensor_cache = None
+        if tensor_cache_dir:
+            self.tensor_cache = ShardedArrayCache(
+                tensor_cache_dir, (3, 224, 224), np.uint8, version="rgb224-uint8",
+                shard_rows=1024, prefix="tensors"
+            )
+
+        self.inference_backend = inference_backend
+        self.calibration_files = calibration_files or []
+        self.backend = self._make_backend(self.model)
+
+    # Architectures a checkpoint can name in its "arch" field
+    ARCHITECTURES = {"resnet18": models.resnet18}
+    ARCH = "resnet18"
+    NUM_CLASSES = 2  # IA vs Real
+
+    @classmethod
+    def _build_model(cls, arch: str = ARCH, num_classes: int = NUM_CLASSES, pretrained: bool = False) -> nn.Module:
+        """The architecture with a `num_classes` head; ImageNet weights only if `pretrained`."""
+        if arch not in cls.ARCHITECTURES:
+            raise ValueError(f"Unknown architecture in checkpoint: {arch}")
+        weights = models.ResNet18_Weights.IMAGENET1K_V1 if pretrained else None
+        model = cls.ARCHITECTURES[arch](weights=weights)
+        model.fc = nn.Linear(model.fc.in_features, num_classes)
+        return model
+
+    def _read_checkpoint(self):
+        """
+        Loads model_path with weights_only (plain tensors and metadata, no pickled
+        code) and memory-mapped, so the file is read once without a second copy.
+        """
+        try:
+            return torch.load(self.model_path, map_location=self.device, weights_only=True, mmap=True)
+        except (TypeError, RuntimeError):
+            # Older torch without mmap=, or a checkpoint in the legacy (non-zip) format
+            return torch.load(self.model_path, map_location=self.device, weights_only=True)
 
     def _load_model(self):
-        model = models.resnet18(weights=models.ResNet18_Weights.IMAGENET1K_V1)
-        num_ftrs = model.fc.in_features
-        model.fc = nn.Linear(num_ftrs, 2)  # 2 classes: IA vs Real
+        model = None
         
         if self.model_path.exists():
             try:
-                state_dict = torch.load(self.model_path, map_location=self.device)
+                checkpoint = self._read_checkpoint()
+                # Checkpoints from before incremental training were trained on every
+                # sample indexed until they were written
+                trained_until = self.model_path.stat().st_mtime
+                if isinstance(checkpoint, dict) and "state_dict" in checkpoint:
+                    state_dict = checkpoint["state_dict"]
+                    arch = checkpoint.get("arch", self.ARCH)
+                    num_classes = checkpoint.get("num_classes", self.NUM_CLASSES)
+                    trained_until = checkpoint.get("trained_until", trained_until)
+                else:
+                    # Checkpoints saved before metadata was added are a bare state_dict
+                    state_dict = checkpoint
+                    arch, num_classes = self.ARCH, self.NUM_CLASSES
+                # Every weight comes from the checkpoint: build the layers on the meta
+                # device (no ImageNet download, no random init) and only allocate them
+                with torch.device("meta"):
+                    model = self._build_model(arch, num_classes)
+                model = model.to_empty(device=self.device)
                 model.load_state_dict(state_dict)
-                print(f"Model loaded from {self.model_path}")
+                del checkpoint, state_dict  # Releases the memory map
+                # Only once the weights are in: a fresh model hasn't seen any sample
+                self.trained_until = trained_until
+                self.fingerprint = self._compute_fingerprint()
+                self.trained_until = max(self.trained_until, self._read_watermark())
+                logger.info("Model loaded from %s", self.model_path)
+            except Exception as e:
+                logger.warning("Failed to load model: %s. Starting fresh.", e)
+                model = None
+
+        if model is None:
+            try:
+                model = self._build_model(pretrained=True)
             except Exception as e:
-                print(f"Failed to load model: {e}. Starting fresh.")
+                # Offline without the ImageNet weights in the torch cache
+                logger.warning("Could not load ImageNet weights (%s); starting from random weights.", e)
+                model = self._build_model()
+
+        if self.fingerprint is None:
+            # The fc head is randomly initialized, so this model is unique to this process
+            self.fingerprint = f"init-{uuid.uuid4().hex}"
         
         model = model.to(self.device)
         model.eval()
         return model
 
-    def save_model(self):
-        torch.save(self.model.state_dict(), self.model_path)
-        print(f"Model saved to {self.model_path}")
+    def _watermark_path(self) -> Path:
+        return self.model_path.with_suffix(".watermark.json")
+
+    def _read_watermark(self) -> float:
+        """trained_until stored by advance_watermark for the current checkpoint, 0 if none."""
+        try:
+            with open(self._watermark_path(), "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return 0.0
+        return data.get("trained_until", 0.0) if data.get("fingerprint") == self.fingerprint else 0.0
+
+    def advance_watermark(self, trained_until: float):
+        """
+        Moves trained_until forward without new weights, e.g. when every pending
+        sample's file is gone. It is stored next to the checkpoint, tied to its
+        fingerprint, rather than rewriting it: a new checkpoint file would change the
+        fingerprint and drop every cached prediction.
+        """
+        if trained_until <= self.trained_until:
+            return
+        self.trained_until = trained_until
+        tmp_path = self._watermark_path().with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"fingerprint": self.fingerprint, "trained_until": trained_until}, f)
+        os.replace(tmp_path, self._watermark_path())
+
+    def _compute_fingerprint(self) -> str:
+        """MD5 of the checkpoint file, read in chunks."""
+        hasher = hashlib.md5()
+        with open(self.model_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                hasher.update(chunk)
+        return hasher.hexdigest()
+
+    @staticmethod
+    def _backbone_id(model: nn.Module) -> str:
+        """MD5 of every weight except the fc head: identifies which embeddings are valid."""
+        hasher = hashlib.md5()
+        for name, tensor in model.state_dict().items():
+            if not name.startswith("fc."):
+                hasher.update(name.encode("utf-8"))
+                hasher.update(tensor.detach().cpu().numpy().tobytes())
+        return hasher.hexdigest()
+
+    @staticmethod
+    def _backbone_forward(model: nn.Module, batch: torch.Tensor) -> torch.Tensor:
+        """Runs every ResNet stage except fc and returns the flattened embeddings."""
+        x = batch
+        for name, module in model.named_children():
+            if name == "fc":
+                break
+            x = module(x)
+        return torch.flatten(x, 1)
+
+    @staticmethod
+    def _use_threads(count: Optional[int]):
+        """
+        Sets torch's intra-op thread count if given and not already set: for the
+        calling thread with OpenMP, for the whole process with a TBB/native pool.
+        """
+        if count and torch.get_num_threads() != count:
+            torch.set_num_threads(count)
+
+    def _infer(self, fn: Callable, *args):
+        """Runs fn(*args) without autograd on the inference worker and returns its result."""
+        def run():
+            self._use_threads(self.inference_threads)
+            with torch.no_grad(), metrics.timer("stage_seconds", stage="forward"):
+                return fn(*args)
+        return self._inference_pool.submit(run).result()
+
+    def _serving(self):
+        """Returns the (model, backend, fingerprint) currently used for predictions."""
+        with self._swap_lock:
+            return self.model, self.backend, self.fingerprint
+
+    def _example_batch(self, max_images: int = 64) -> torch.Tensor:
+        """Calibration/validation input for the inference backend."""
+        tensors = [self._load_tensor(f) for f in self.calibration_files[:max_images]]
+        tensors = [t for t in tensors if t is not None]
+        if not tensors:
+            logger.warning("No calibration images for the inference backend; validating on random input")
+            return torch.randn(8, 3, 224, 224, device=self.device)
+        return torch.stack(tensors).to(self.device)
+
+    def _make_backend(self, model: nn.Module) -> InferenceBackend:
+        if self.inference_backend == InferenceBackend.name:
+            return InferenceBackend(model, self.device)
+        return create_backend(self.inference_backend, model, self.device, self._example_batch(),
+                              onnx_path=str(self.model_path.with_suffix(".onnx")))
+
+    def save_model(self, model: Optional[nn.Module] = None, trained_until: Optional[float] = None):
+        """
+        Writes `model` (default: the serving model) to model_path and makes it the
+        serving model. The swap happens in one step, so predictions see either the
+        old or the new weights, never a mix.
+        """
+        model = model if model is not None else self.model
+        model.eval()
+        if trained_until is not None:
+            self.trained_until = trained_until
+
+        # Write to a temp file first so a crash never leaves a truncated checkpoint
+        tmp_path = self.model_path.with_suffix(".pth.tmp")
+        torch.save({
+            "state_dict": model.state_dict(),
+            "arch": self.ARCH,
+            "num_classes": model.fc.out_features,
+            "trained_until": self.trained_until,
+        }, tmp_path)
+        os.replace(tmp_path, self.model_path)
+        fingerprint = self._compute_fingerprint()
+        backend = self._make_backend(model)
+
+        with self._swap_lock:
+            self.model = model
+            self.backend = backend
+            self.fingerprint = fingerprint
+        logger.info("Model saved to %s", self.model_path)
+
+        # New weights: cached predictions of the previous model are no longer valid
+        if self.prediction_cache:
+            self.prediction_cache.invalidate(fingerprint)
 
     def predict(self, image_path: str) -> Dict:
         try:
             image = Image.open(image_path).convert("RGB")
             image = self.transform(image).unsqueeze(0).to(self.device)
+            _, backend, _ = self._serving()
             
-            with torch.no_grad():
-                outputs = self.model(image)
-                probabilities = torch.nn.functional.softmax(outputs, dim=1)
-                confidence, predicted = torch.max(probabilities, 1)
+            outputs = self._infer(backend, image)
+            probabilities = torch.nn.functional.softmax(outputs, dim=1)
+            confidence, predicted = torch.max(probabilities, 1)
+            metrics.inc("predictions_total", source="model")
                 
             label = "ia" if predicted.item() == 0 else "real" # Assuming 0=IA, 1=Real. Need to standardize this.
             # Let's standardize: 0 = IA, 1 = Real
@@ -75,42 +355,281 @@ class ModelManager:
                 "confidence": float(confidence.item())
             }
         except Exception as e:
-            print(f"Error predicting {image_path}: {e}")
+            logger.error("Error predicting %s: %s", image_path, e)
             return {"label": "error", "confidence": 0.0}
 
-    def train(self, data_files: Dict[str, List[str]], epochs=5):
+    def _load_tensor(self, image_path: str) -> Optional[torch.Tensor]:
+        """Decodes and transforms one image. Returns None if it can't be read."""
+        try:
+            with metrics.timer("stage_seconds", stage="decode"):
+                image = Image.open(image_path).convert("RGB")
+            with metrics.timer("stage_seconds", stage="transform"):
+                return self.transform(image)
+        except Exception as e:
+            logger.error("Error predicting %s: %s", image_path, e)
+            return None
+
+    def predict_batch(self, image_paths: List[str], batch_size: int = 32, num_workers: int = 4,
+                      hashes: Optional[List[str]] = None) -> List[Dict]:
+        """
+        Predicts a list of images running the model over `batch_size` images at a time.
+        Decoding is done in a thread pool while the model runs on the current batch.
+        Returns one {'label', 'confidence'} dict per path, in the same order,
+        with {'label': 'error', 'confidence': 0.0} for files that failed.
+
+        If `hashes` (content hash per path) is given and a prediction cache is
+        configured, cached predictions are reused and only the misses are run.
+        """
+        with metrics.timer("operation_seconds", operation="predict_batch"):
+            return self._predict_batch(image_paths, batch_size, num_workers, hashes)
+
+    def _predict_batch(self, image_paths: List[str], batch_size: int, num_workers: int,
+                       hashes: Optional[List[str]]) -> List[Dict]:
+        model, backend, fingerprint = self._serving()
+
+        if hashes is not None and self.prediction_cache:
+            with metrics.timer("stage_seconds", stage="prediction_cache_read"):
+                cached = self.prediction_cache.get_many(hashes, fingerprint)
+            missing = [i for i, h in enumerate(hashes) if h not in cached]
+            metrics.inc("predictions_total", len(hashes) - len(missing), source="cache")
+
+            predicted = self._predict_uncached(model, backend, [image_paths[i] for i in missing], batch_size,
+                                               num_workers, hashes=[hashes[i] for i in missing])
+            new_entries = {hashes[i]: p for i, p in zip(missing, predicted) if p["label"] != "error"}
+            with metrics.timer("stage_seconds", stage="prediction_cache_write"):
+                self.prediction_cache.put_many(new_entries, fingerprint)
+
+            results = [cached.get(h) for h in hashes]
+            for i, p in zip(missing, predicted):
+                results[i] = p
+            return results
+
+        return self._predict_uncached(model, backend, image_paths, batch_size, num_workers, hashes=hashes)
+
+    def _iter_batches(self, image_paths: List[str], batch_size: int, num_workers: int):
+        """
+        Yields (indices, tensor batch) for the readable images, decoding in a thread
+        pool one batch ahead so memory stays bounded to two batches.
+        """
+        if not image_paths:
+            return
+
+        batches = [range(start, min(start + batch_size, len(image_paths)))
+                   for start in range(0, len(image_paths), batch_size)]
+
+        with ThreadPoolExecutor(max_workers=max(1, num_workers)) as pool:
+            def submit(indices):
+                return [(i, pool.submit(self._load_tensor, image_paths[i])) for i in indices]
+
+            pending = submit(batches[0])
+            for b in range(len(batches)):
+                current = pending
+                pending = submit(batches[b + 1]) if b + 1 < len(batches) else []
+
+                valid = [(i, f.result()) for i, f in current]
+                valid = [(i, t) for i, t in valid if t is not None]
+                if not valid:
+                    continue
+
+                yield [i for i, _ in valid], torch.stack([t for _, t in valid]).to(self.device)
+
+    def _embed(self, model: nn.Module, image_paths: List[str], hashes: List[str],
+               batch_size: int = 32, num_workers: int = 4, on_worker: bool = True) -> List[Optional[np.ndarray]]:
+        """
+        Backbone embeddings per image (None if unreadable), computed only for cache misses.
+        on_worker=False runs the backbone in the calling thread (training uses its own budget).
+        """
+        cached = self.feature_cache.get_many(hashes)
+        embeddings = [cached.get(h) for h in hashes]
+        missing = [i for i, e in enumerate(embeddings) if e is None]
+
+        new_vectors = {}
+        for indices, batch in self._iter_batches([image_paths[i] for i in missing], batch_size, num_workers):
+            if on_worker:
+                features = self._infer(self._backbone_forward, model, batch)
+            else:
+                with torch.no_grad():
+                    features = self._backbone_forward(model, batch)
+            features = features.cpu().numpy()
+            for j, vector in zip(indices, features):
+                embeddings[missing[j]] = vector
+                new_vectors[hashes[missing[j]]] = vector
+
+        if new_vectors:
+            self.feature_cache.put_many(new_vectors)
+        return embeddings
+
+    @staticmethod
+    def _to_predictions(outputs: torch.Tensor) -> List[Dict]:
+        probabilities = torch.nn.functional.softmax(outputs, dim=1)
+        confidence, predicted = torch.max(probabilities, 1)
+        # Single device->host copy per batch instead of one .item() per image
+        return [
+            {"label": "ia" if pred == 0 else "real", "confidence": float(conf)}  # 0 = IA, 1 = Real
+            for pred, conf in zip(predicted.cpu().tolist(), confidence.cpu().tolist())
+        ]
+
+    def _predict_uncached(self, model: nn.Module, backend: InferenceBackend, image_paths: List[str],
+                          batch_size: int, num_workers: int, hashes: Optional[List[str]] = None) -> List[Dict]:
+        results = [{"label": "error", "confidence": 0.0} for _ in image_paths]
+        if not image_paths:
+            return results
+        metrics.inc("predictions_total", len(image_paths), source="model")
+
+        if self.feature_cache is not None and hashes is not None:
+            # Head-only mode: cached embeddings skip the backbone entirely
+            embeddings = self._embed(model, image_paths, hashes, batch_size, num_workers)
+            valid = [i for i, e in enumerate(embeddings) if e is not None]
+            if valid:
+                features = torch.from_numpy(np.stack([embeddings[i] for i in valid])).to(self.device)
+                predictions = self._to_predictions(self._infer(model.fc, features))
+                for i, p in zip(valid, predictions):
+                    results[i] = p
+            return results
+
+        for indices, batch in self._iter_batches(image_paths, batch_size, num_workers):
+            predictions = self._to_predictions(self._infer(backend, batch))
+            for i, p in zip(indices, predictions):
+                results[i] = p
+
+        return results
+
+    def train(self, data_files: Dict[str, List[str]], epochs=5, progress_callback=None,
+              new_files: Optional[Dict[str, List[str]]] = None, replay_per_class: int = 256,
+              trained_until: Optional[float] = None):
         """
         data_files: {'real': [paths], 'ia': [paths]}
+        Trains a copy of the serving model and swaps it in when done, so
+        predictions keep using the previous weights meanwhile.
+        progress_callback, if given, receives {'epoch', 'epochs', 'batch', 'batches'}
+        after every batch.
+
+        Full retrain (default): every file in data_files.
+        Incremental (new_files given): only new_files plus a random replay sample of
+        up to `replay_per_class` older files per class from data_files, so the cost
+        doesn't grow with the dataset. `trained_until` is stored in the checkpoint.
         """
-        self.model.train()
-        
+        with self._train_lock, metrics.timer("operation_seconds", operation="train"):
+            self._use_threads(self.train_threads)
+            if new_files is not None:
+                data_files = self._incremental_selection(data_files, new_files, replay_per_class)
+                if data_files is None:
+                    logger.info("No new samples since last checkpoint.")
+                    if trained_until is not None:
+                        # The pending entries (if any) point at files that are gone:
+                        # skip past them, or every later run would pick them again
+                        self.advance_watermark(trained_until)
+                    return {}
+            if self.head_only:
+                return self._train_head(data_files, epochs, progress_callback, trained_until)
+            return self._train(data_files, epochs, progress_callback, trained_until)
+
+    @staticmethod
+    def _incremental_selection(data_files: Dict[str, List[str]], new_files: Dict[str, List[str]],
+                               replay_per_class: int) -> Optional[Dict[str, List[str]]]:
+        """New samples plus a class-balanced replay sample of older ones."""
+        new_set = set(new_files.get("ia", []) + new_files.get("real", []))
+        if not new_set:
+            return None
+
+        selection = {}
+        for label in ("ia", "real"):
+            older = [f for f in data_files.get(label, []) if f not in new_set]
+            replay = random.sample(older, min(replay_per_class, len(older)))
+            selection[label] = new_files.get(label, []) + replay
+            logger.info("Incremental training [%s]: %d new + %d replay", label, len(new_files.get(label, [])), len(replay))
+        return selection
+
+    def _resized_array(self, image_path: str) -> Optional[np.ndarray]:
+        """Decodes and resizes one image to a (3, 224, 224) uint8 array, None if unreadable."""
+        try:
+            image = self.resize(Image.open(image_path).convert("RGB"))
+            return np.asarray(image, dtype=np.uint8).transpose(2, 0, 1)
+        except Exception as e:
+            logger.error("Error caching %s: %s", image_path, e)
+            return None
+
+    def _cache_tensors(self, files: List[str], chunk_size: int = 256, num_workers: int = 4) -> List[Optional[int]]:
+        """
+        Makes sure every file is in the tensor cache, decoding only the misses.
+        Returns the cache row per file (None if it couldn't be read).
+        """
+        hashes = []
+        for f in files:
+            try:
+                hashes.append(self.hash_fn(f))
+            except OSError:
+                hashes.append(None)
+
+        rows = self.tensor_cache.get_rows([h for h in hashes if h is not None])
+        missing = [i for i, h in enumerate(hashes) if h is not None and h not in rows]
+        if missing:
+            logger.info("Tensor cache: decoding %d new images", len(missing))
+            with ThreadPoolExecutor(max_workers=max(1, num_workers)) as pool:
+                # Chunked so at most `chunk_size` decoded images are held in memory
+                for start in range(0, len(missing), chunk_size):
+                    chunk = missing[start:start + chunk_size]
+                    arrays = pool.map(self._resized_array, [files[i] for i in chunk])
+                    rows.update(self.tensor_cache.put_many(
+                        {hashes[i]: a for i, a in zip(chunk, arrays) if a is not None}
+                    ))
+
+        return [rows.get(h) if h is not None else None for h in hashes]
+
+    def _make_loader(self, dataset: Dataset) -> DataLoader:
+        options = {"batch_size": 16, "shuffle": True, "pin_memory": self.device.type == "cuda"}
+        if self.loader_workers > 0:
+            options.update(num_workers=self.loader_workers, prefetch_factor=self.loader_prefetch,
+                           persistent_workers=True)
+        return DataLoader(dataset, **options)
+
+    def _train(self, data_files: Dict[str, List[str]], epochs, progress_callback, trained_until):
         # Prepare data
         files = data_files['ia'] + data_files['real']
         # 0 for IA, 1 for Real
         labels = [0] * len(data_files['ia']) + [1] * len(data_files['real'])
         
         if not files:
-            print("No data to train on.")
+            logger.info("No data to train on.")
             return {}
 
-        dataset = CustomDataset(files, labels, self.transform)
-        dataloader = DataLoader(dataset, batch_size=16, shuffle=True)
+        if self.tensor_cache is not None:
+            rows = self._cache_tensors(files)
+            readable = [i for i, r in enumerate(rows) if r is not None]
+            files = [files[i] for i in readable]
+            labels = [labels[i] for i in readable]
+            dataset = CustomDataset(files, labels, self.transform, tensor_rows=[rows[i] for i in readable],
+                                    tensor_reader=self.tensor_cache.reader(), normalize=self.normalize)
+        else:
+            dataset = CustomDataset(files, labels, self.transform)
+        if not files:
+            logger.info("No readable images to train on.")
+            return {}
+        dataloader = self._make_loader(dataset)
+
+        model = copy.deepcopy(self.model)
+        model.train()
         
         criterion = nn.CrossEntropyLoss()
-        optimizer = optim.SGD(self.model.parameters(), lr=0.001, momentum=0.9)
+        optimizer = optim.SGD(model.parameters(), lr=0.001, momentum=0.9)
         
-        metrics = {"accuracy": 0, "loss": 0}
+        epoch_metrics = {"accuracy": 0, "loss": 0}
         
         for epoch in range(epochs):
             running_loss = 0.0
             correct = 0
             total = 0
+            epoch_start = time.perf_counter()
             
-            for inputs, labels_batch in dataloader:
-                inputs, labels_batch = inputs.to(self.device), labels_batch.to(self.device)
+            for batch_idx, (inputs, labels_batch) in enumerate(dataloader):
+                # Again per batch for process-wide pools, where predictions made
+                # meanwhile set their own budget (a no-op check with OpenMP)
+                self._use_threads(self.train_threads)
+                inputs = inputs.to(self.device, non_blocking=True)
+                labels_batch = labels_batch.to(self.device, non_blocking=True)
                 
                 optimizer.zero_grad()
-                outputs = self.model(inputs)
+                outputs = model(inputs)
                 loss = criterion(outputs, labels_batch)
                 loss.backward()
                 optimizer.step()
@@ -119,12 +638,95 @@ class ModelManager:
                 _, predicted = torch.max(outputs.data, 1)
                 total += labels_batch.size(0)
                 correct += (predicted == labels_batch).sum().item()
+
+                if progress_callback:
+                    progress_callback({
+                        "epoch": epoch + 1,
+                        "epochs": epochs,
+                        "batch": batch_idx + 1,
+                        "batches": len(dataloader)
+                    })
             
+            epoch_time = time.perf_counter() - epoch_start
             epoch_acc = 100 * correct / total
             epoch_loss = running_loss / len(dataloader)
-            print(f"Epoch {epoch+1}/{epochs} - Loss: {epoch_loss:.4f} - Acc: {epoch_acc:.2f}%")
-            metrics = {"accuracy": epoch_acc, "loss": epoch_loss}
+            images_per_sec = total / epoch_time if epoch_time > 0 else 0.0
+            metrics.inc("training_images_total", total, mode="full")
+            logger.info("Epoch %d/%d - Loss: %.4f - Acc: %.2f%% - %.1f img/s",
+                        epoch + 1, epochs, epoch_loss, epoch_acc, images_per_sec)
+            epoch_metrics = {"accuracy": epoch_acc, "loss": epoch_loss, "images_per_sec": images_per_sec}
+
+        self.save_model(model, trained_until=trained_until)
+        return epoch_metrics
+
+    def _train_head(self, data_files: Dict[str, List[str]], epochs, progress_callback, trained_until):
+        """Head-only training: fits `fc` on cached backbone embeddings."""
+        files = data_files['ia'] + data_files['real']
+        # 0 for IA, 1 for Real
+        labels = [0] * len(data_files['ia']) + [1] * len(data_files['real'])
+
+        if not files:
+            logger.info("No data to train on.")
+            return {}
+
+        model = copy.deepcopy(self.model)
+        model.eval()  # Backbone stays in inference mode (frozen batch-norm statistics)
+
+        hashes = []
+        for f in files:
+            try:
+                hashes.append(self.hash_fn(f))
+            except OSError:
+                hashes.append(None)
+        readable = [i for i, h in enumerate(hashes) if h is not None]
+        embeddings = self._embed(model, [files[i] for i in readable], [hashes[i] for i in readable],
+                                 on_worker=False)
+        valid = [(readable[j], e) for j, e in enumerate(embeddings) if e is not None]
+        if not valid:
+            logger.info("No readable images to train on.")
+            return {}
+
+        features = torch.from_numpy(np.stack([e for _, e in valid])).to(self.device)
+        targets = torch.tensor([labels[i] for i, _ in valid], device=self.device)
+
+        head = model.fc
+        head.train()
+        criterion = nn.CrossEntropyLoss()
+        optimizer = optim.SGD(head.parameters(), lr=0.001, momentum=0.9)
+        batches = (len(valid) + 15) // 16
+
+        epoch_metrics = {"accuracy": 0, "loss": 0}
+
+        for epoch in range(epochs):
+            running_loss = 0.0
+            correct = 0
+            order = torch.randperm(len(valid), device=self.device)
+
+            for batch_idx in range(batches):
+                self._use_threads(self.train_threads)
+                idx = order[batch_idx * 16:(batch_idx + 1) * 16]
+                optimizer.zero_grad()
+                outputs = head(features[idx])
+                loss = criterion(outputs, targets[idx])
+                loss.backward()
+                optimizer.step()
+
+                running_loss += loss.item()
+                correct += (outputs.argmax(1) == targets[idx]).sum().item()
+
+                if progress_callback:
+                    progress_callback({
+                        "epoch": epoch + 1,
+                        "epochs": epochs,
+                        "batch": batch_idx + 1,
+                        "batches": batches
+                    })
+
+            epoch_acc = 100 * correct / len(valid)
+            epoch_loss = running_loss / batches
+            metrics.inc("training_images_total", len(valid), mode="head_only")
+            logger.info("Epoch %d/%d (head only) - Loss: %.4f - Acc: %.2f%%", epoch + 1, epochs, epoch_loss, epoch_acc)
+            epoch_metrics = {"accuracy": epoch_acc, "loss": epoch_loss}
 
-        self.save_model()
-        self.model.eval()
-        return metrics
+        self.save_model(model, trained_until=trained_until)
+        return epoch_metrics
@@ -0,0 +1,100 @@
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+
+class PredictionCache:
+    """
+    On-disk cache of model predictions keyed by (file hash, model fingerprint).
+    Entries of older fingerprints are dropped with invalidate(), and the table
+    is kept under `max_entries` by evicting the least recently used rows.
+    """
+
+    def __init__(self, db_path: str, max_entries: int = 50000):
+        self.db_path = Path(db_path)
+        self.max_entries = max_entries
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS predictions (
+                    hash TEXT NOT NULL,
+                    fingerprint TEXT NOT NULL,
+                    label TEXT NOT NULL,
+                    confidence REAL NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (hash, fingerprint)
+                )
+            """)
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_predictions_last_used ON predictions (last_used)"
+            )
+
+    def get_many(self, hashes: List[str], fingerprint: str) -> Dict[str, Dict]:
+        """Returns {hash: {'label', 'confidence'}} for the hashes found in the cache."""
+        found = {}
+        if not hashes:
+            return found
+
+        unique = list(set(hashes))
+        now = time.time()
+        with self._lock, self._conn:
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(unique), 500):
+                chunk = unique[start:start + 500]
+                marks = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT hash, label, confidence FROM predictions "
+                    f"WHERE fingerprint = ? AND hash IN ({marks})",
+                    [fingerprint] + chunk
+                ).fetchall()
+                for file_hash, label, confidence in rows:
+                    found[file_hash] = {"label": label, "confidence": confidence}
+
+                self._conn.execute(
+                    f"UPDATE predictions SET last_used = ? "
+                    f"WHERE fingerprint = ? AND hash IN ({marks})",
+                    [now, fingerprint] + chunk
+                )
+        return found
+
+    def put_many(self, entries: Dict[str, Dict], fingerprint: str):
+        """Stores {hash: {'label', 'confidence'}} and evicts the oldest rows if over capacity."""
+        if not entries:
+            return
+
+        now = time.time()
+        rows = [(h, fingerprint, p["label"], p["confidence"], now) for h, p in entries.items()]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO predictions (hash, fingerprint, label, confidence, last_used) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            count = self._conn.execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM predictions WHERE rowid IN "
+                    "(SELECT rowid FROM predictions ORDER BY last_used LIMIT ?)",
+                    (count - self.max_entries,)
+                )
+
+    def invalidate(self, fingerprint: str):
+        """Drops every prediction not made by the model with `fingerprint`."""
+        with self._lock, self._conn:
+            deleted = self._conn.execute(
+                "DELETE FROM predictions WHERE fingerprint != ?", (fingerprint,)
+            ).rowcount
+        if deleted:
+            logger.info("Prediction cache: dropped %d stale entries", deleted)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
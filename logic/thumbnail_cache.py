@@ -0,0 +1,56 @@
+import logging
+import os
+import uuid
+from pathlib import Path
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+
+class ThumbnailCache:
+    """
+    Downscaled previews stored per image content hash, generated once:
+    <cache_dir>/<hash[:2]>/<hash>_<size>.<ext>. Since the name depends only on the
+    content, renamed or re-uploaded copies reuse the same file.
+    """
+
+    EXTENSIONS = {"JPEG": "jpg", "WEBP": "webp"}
+
+    def __init__(self, cache_dir: str, size: int = 256, image_format: str = "JPEG", quality: int = 80):
+        if image_format not in self.EXTENSIONS:
+            raise ValueError(f"Unsupported thumbnail format: {image_format}")
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.size = size
+        self.image_format = image_format
+        self.quality = quality
+
+    @property
+    def mimetype(self) -> str:
+        return "image/jpeg" if self.image_format == "JPEG" else "image/webp"
+
+    def path_for(self, file_hash: str) -> Path:
+        ext = self.EXTENSIONS[self.image_format]
+        return self.cache_dir / file_hash[:2] / f"{file_hash}_{self.size}.{ext}"
+
+    def get(self, image_path: str, file_hash: str) -> Path:
+        """Returns the thumbnail of `image_path`, creating it if needed."""
+        thumb_path = self.path_for(file_hash)
+        if not thumb_path.exists():
+            self._create(image_path, thumb_path)
+        return thumb_path
+
+    def _create(self, image_path: str, thumb_path: Path):
+        with Image.open(image_path) as image:
+            # JPEG files are decoded directly at a reduced scale (much cheaper than a full decode)
+            image.draft("RGB", (self.size, self.size))
+            image = image.convert("RGB")
+            image.thumbnail((self.size, self.size))
+
+            thumb_path.parent.mkdir(parents=True, exist_ok=True)
+            # Unique temp name: two requests for the same image may race here
+            tmp_path = thumb_path.with_name(f".{uuid.uuid4().hex}.tmp")
+            image.save(tmp_path, self.image_format, quality=self.quality)
+        os.replace(tmp_path, thumb_path)
+        logger.debug("Thumbnail created for %s", image_path)
@@ -0,0 +1,142 @@
+import logging
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TrainingScheduler:
+    """
+    Single background worker that runs training on behalf of accept events.
+
+    notify() only records new samples; the worker starts a run once `min_samples`
+    are pending or `debounce_seconds` have passed since the first pending event,
+    and never sooner than `min_interval` after the previous run. Events that
+    arrive while training are coalesced into the next run.
+
+    run_fn(progress_callback, full_retrain=False) performs one training run and
+    returns its metrics.
+    """
+
+    def __init__(self, run_fn: Callable[..., Dict],
+                 min_samples: int = 50, debounce_seconds: float = 30.0, min_interval: float = 60.0):
+        self.run_fn = run_fn
+        self.min_samples = min_samples
+        self.debounce_seconds = debounce_seconds
+        self.min_interval = min_interval
+
+        self._cond = threading.Condition()
+        self._pending = 0
+        self._first_pending_at = None
+        self._force = False
+        self._full_retrain = False
+        self._stopped = False
+
+        self._state = "idle"  # idle | waiting | training
+        self._progress = None
+        self._runs = 0
+        self._last_started = None
+        self._last_finished = None
+        self._last_metrics = None
+        self._last_error = None
+
+        self._thread = threading.Thread(target=self._loop, name="training-scheduler", daemon=True)
+        self._thread.start()
+
+    def notify(self, new_samples: int = 1):
+        """Records newly accepted samples. Never blocks on training."""
+        if new_samples <= 0:
+            return
+        with self._cond:
+            if self._pending == 0:
+                self._first_pending_at = time.time()
+            self._pending += new_samples
+            if self._state == "idle":
+                self._state = "waiting"
+            self._cond.notify()
+
+    def run_now(self, full_retrain: bool = False):
+        """Starts a run as soon as the current one (if any) finishes, ignoring the debounce."""
+        with self._cond:
+            self._force = True
+            self._full_retrain = self._full_retrain or full_retrain
+            if self._state == "idle":
+                self._state = "waiting"
+            self._cond.notify()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+
+    def status(self) -> Dict:
+        with self._cond:
+            return {
+                "state": self._state,
+                "pending_samples": self._pending,
+                "progress": self._progress,
+                "runs": self._runs,
+                "last_started": self._last_started,
+                "last_finished": self._last_finished,
+                "last_metrics": self._last_metrics,
+                "last_error": self._last_error,
+                "min_samples": self.min_samples,
+                "debounce_seconds": self.debounce_seconds,
+                "min_interval": self.min_interval,
+            }
+
+    def _seconds_until_due(self) -> Optional[float]:
+        """0 if a run should start now, seconds to wait otherwise, None if nothing is pending."""
+        if not self._force and self._pending == 0:
+            return None
+
+        now = time.time()
+        wait = 0.0
+        if not self._force and self._pending < self.min_samples:
+            wait = self._first_pending_at + self.debounce_seconds - now
+        if self._last_finished is not None:
+            wait = max(wait, self._last_finished + self.min_interval - now)
+        return max(wait, 0.0)
+
+    def _set_progress(self, progress: Dict):
+        with self._cond:
+            self._progress = progress
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while not self._stopped:
+                    wait = self._seconds_until_due()
+                    if wait == 0:
+                        break
+                    self._cond.wait(timeout=wait)
+                if self._stopped:
+                    return
+
+                samples = self._pending
+                self._pending = 0
+                self._first_pending_at = None
+                self._force = False
+                full_retrain = self._full_retrain
+                self._full_retrain = False
+                self._state = "training"
+                self._progress = None
+                self._last_started = time.time()
+
+            logger.info("Training scheduler: starting %s run with %d new samples",
+                        "full" if full_retrain else "scheduled", samples)
+            metrics, error = None, None
+            try:
+                metrics = self.run_fn(self._set_progress, full_retrain=full_retrain)
+            except Exception as e:
+                error = str(e)
+                logger.exception("Training failed: %s", e)
+
+            with self._cond:
+                self._runs += 1
+                self._last_finished = time.time()
+                self._last_metrics = metrics
+                self._last_error = error
+                # run_fn may have called run_now() (e.g. a backlog is left)
+                self._state = "waiting" if self._pending or self._force else "idle"
@@ -1,18 +1,23 @@
 import uvicorn
-from fastapi import FastAPI, BackgroundTasks, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import List, Optional
 import os
 import sys
+import time
 from pathlib import Path
 
 # Add current directory to path so we can import modules
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "logic"))
 
 from data_manager import DataManager
 from model_manager import ModelManager
+from training_scheduler import TrainingScheduler
+from metrics import metrics
 
 # Configuration
 if getattr(sys, 'frozen', False):
@@ -35,9 +40,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def time_requests(request: Request, call_next):
+    started = time.perf_counter()
+    response = await call_next(request)
+    # Route template (e.g. /api/images), not the raw path, keeps the label set small
+    route = request.scope.get("route")
+    metrics.observe("request_seconds", time.perf_counter() - started,
+                    endpoint=getattr(route, "path", "static"), method=request.method)
+    return response
+
 # Managers
 dm = DataManager(DATA_DIR)
-mm = ModelManager(os.path.join(DATA_DIR, "modelo", "modelo_actual.pth"))
+mm = ModelManager(
+    os.path.join(DATA_DIR, "modelo", "modelo_actual.pth"),
+    cache_path=os.path.join(DATA_DIR, "index", "prediction_cache.db")
+)
 
 # Models
 class MoveRequest(BaseModel):
@@ -53,10 +71,11 @@ class TrainRequest(BaseModel):
 def get_images():
     """List images in entrada with pre-classification."""
     files = dm.scan_entrada()
+    paths = [os.path.join(dm.paths["entrada"], f) for f in files]
+    hashes = [dm.get_file_hash(p) for p in paths]
+    predictions = mm.predict_batch(paths, hashes=hashes)
     results = []
-    for f in files:
-        full_path = os.path.join(dm.paths["entrada"], f)
-        prediction = mm.predict(full_path)
+    for f, prediction in zip(files, predictions):
         results.append({
             "filename": f,
             "prediction": prediction,
@@ -65,34 +84,56 @@ def get_images():
     return results
 
 @app.post("/api/move")
-def move_image(req: MoveRequest, background_tasks: BackgroundTasks):
+def move_image(req: MoveRequest):
     try:
         dm.move_and_index(req.filename, req.label)
         
-        # Trigger auto-training in background
-        background_tasks.add_task(run_training)
+        # Queue auto-training in background (coalesced with other moves)
+        training_scheduler.notify(1)
         
         return {"status": "success", "message": f"Moved {req.filename} to {req.label}"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-def run_training():
+def run_training(progress_callback=None, full_retrain=False):
     print("Starting background training...")
+    started = time.time()
     data = dm.get_dataset_files()
-    metrics = mm.train(data, epochs=1) # Short epoch for incremental
+    new_files, trained_until = None, started
+    if not full_retrain:
+        new_files, trained_until = dm.get_new_samples(mm.trained_until, limit=512)
+    metrics = mm.train(data, epochs=1, progress_callback=progress_callback, # Short epoch for incremental
+                       new_files=new_files, trained_until=trained_until)
     print(f"Training finished: {metrics}")
-    # Log metrics if needed
+    if new_files is not None and dm.has_new_samples(mm.trained_until):
+        # The window was capped: drain the rest without waiting for the next move
+        training_scheduler.run_now()
+    return metrics
+
+training_scheduler = TrainingScheduler(run_training)
+
+@app.get("/api/training")
+def get_training_status():
+    return training_scheduler.status()
+
+@app.post("/api/training")
+def start_training():
+    training_scheduler.run_now()
+    return training_scheduler.status()
+
+@app.get("/api/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Counters and timing histograms in the Prometheus text format."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
 @app.get("/api/stats")
 def get_stats():
-    # Return simple stats from index
-    index = dm.load_index()
-    real_count = sum(1 for v in index.values() if v["label"] == "real")
-    ia_count = sum(1 for v in index.values() if v["label"] == "ia")
+    # Return simple stats from index (GROUP BY on the indexed label column)
+    counts = dm.index.count_by_label()
     return {
-        "total_indexed": len(index),
-        "real": real_count,
-        "ia": ia_count
+        "total_indexed": sum(counts.values()),
+        "real": counts.get("real", 0),
+        "ia": counts.get("ia", 0)
     }
 
 # Serve Images
@@ -22,8 +22,14 @@ class SubclassifierManager:
         'rubias'
     ]
     
-    def __init__(self, base_dir: str):
+    def __init__(self, base_dir: str, data_manager=None):
+        """
+        data_manager (DataManager of the same base_dir), if given, is told about every
+        image that leaves clasificaciones/real, so its dataset counters stay current.
+        Without it the 'clasificaciones_real' count drifts until it is reconciled.
+        """
         self.base_dir = Path(base_dir)
+        self.data_manager = data_manager
         self.source_dir = self.base_dir / "clasificaciones" / "real"
         self.target_base_dir = self.base_dir / "subclasificadas" / "reales"
         self.index_file = self.base_dir / "index" / "subclassification_index.json"
@@ -55,19 +61,30 @@ class SubclassifierManager:
             json.dump(index, f, indent=2, ensure_ascii=False)
     
     def scan_source_images(self) -> List[str]:
-        """Scan images in clasificaciones/real folder"""
+        """
+        Scan images in clasificaciones/real folder. Returns paths relative to it,
+        so images in the sharded layout (ab/cd/<hash>.jpg) are found too.
+        """
         if not self.source_dir.exists():
             return []
         
         valid_extensions = {'.jpg', '.jpeg', '.png', '.webp', '.bmp'}
         images = []
         
-        for file in self.source_dir.iterdir():
-            if file.is_file() and file.suffix.lower() in valid_extensions:
-                images.append(file.name)
+        for root, _dirs, files in os.walk(self.source_dir):
+            for name in files:
+                if Path(name).suffix.lower() in valid_extensions:
+                    images.append((Path(root) / name).relative_to(self.source_dir).as_posix())
         
         return sorted(images)
     
+    def _source_path(self, filename: str) -> Path:
+        """Path of an image returned by scan_source_images, refusing anything outside source_dir"""
+        source_path = (self.source_dir / filename).resolve()
+        if self.source_dir.resolve() not in source_path.parents:
+            raise ValueError(f"Invalid filename: {filename}")
+        return source_path
+    
     def predict_category(self, image_path: str) -> Dict:
         """
         Predict category for an image.
@@ -85,14 +102,16 @@ class SubclassifierManager:
         if category not in self.CATEGORIES:
             raise ValueError(f"Invalid category: {category}")
         
-        source_path = self.source_dir / filename
-        target_path = self.target_base_dir / category / filename
+        source_path = self._source_path(filename)
+        # Sharded images (ab/cd/<hash>.jpg) land flat in the category folder
+        target_path = self.target_base_dir / category / source_path.name
         
         if not source_path.exists():
             raise FileNotFoundError(f"Source file not found: {filename}")
         
         # Move file
         shutil.move(str(source_path), str(target_path))
+        self._source_removed(filename)
         
         # Update index
         index = self.load_index()
@@ -152,7 +171,7 @@ class SubclassifierManager:
         results = []
         
         for img in images:
-            img_path = self.source_dir / img
+            img_path = self._source_path(img)
             prediction = self.predict_category(str(img_path))
             
             results.append({
@@ -165,10 +184,15 @@ class SubclassifierManager:
     
     def remove_image(self, filename: str) -> bool:
         """Remove an image from the source folder"""
-        source_path = self.source_dir / filename
+        source_path = self._source_path(filename)
         
         if not source_path.exists():
             raise FileNotFoundError(f"File not found: {filename}")
         
         os.remove(source_path)
+        self._source_removed(filename)
         return True
+
+    def _source_removed(self, filename: str):
+        if self.data_manager is not None:
+            self.data_manager.dataset_file_removed("real", filename)
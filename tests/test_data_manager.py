@@ -0,0 +1,171 @@
+"""DataManager: persisted counters, new-sample windows and the entrada queue."""
+import os
+import shutil
+import sys
+
+import numpy as np
+import pytest
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "logic"))
+
+from data_manager import DataManager  # noqa: E402
+
+
+def make_images(folder, count, prefix="img", seed=0):
+    rng = np.random.default_rng(seed)
+    folder.mkdir(parents=True, exist_ok=True)
+    names = []
+    for i in range(count):
+        name = f"{prefix}{i}.jpg"
+        Image.fromarray(rng.integers(0, 256, (32, 32, 3), dtype=np.uint8)).save(folder / name)
+        names.append(name)
+    return names
+
+
+@pytest.fixture
+def dm(tmp_path):
+    manager = DataManager(str(tmp_path))
+    yield manager
+    manager.stop_watcher()
+    manager.index.close()
+
+
+def accept(dm, label="real"):
+    return dm.process_batch([{"filename": name, "label": label} for name in dm.scan_entrada()])
+
+
+def test_entrada_filled_by_hand_never_goes_negative(dm):
+    dm.reconcile_counters()
+    make_images(dm.paths["entrada"], 3)
+    assert dm.get_detailed_stats()["entrada"] == 3
+
+    accept(dm)
+
+    stats = dm.get_detailed_stats()
+    assert stats["entrada"] == 0
+    assert stats["clasificaciones_real"] == 3
+
+
+def test_polling_watcher_relists_dataset_folders_rarely(dm):
+    import time
+
+    dm.start_watcher(backend="polling", poll_interval=0.05, dataset_poll_interval=3600)
+    make_images(dm.paths["entrada"], 1)
+    make_images(dm.paths["dataset_base_real"], 1)
+    time.sleep(0.3)
+
+    assert "img0.jpg" in dm.folder_states["entrada"]
+    assert "img0.jpg" not in dm.folder_states["dataset_base_real"]
+
+
+def test_entrada_duplicates_are_listed_and_removable(dm):
+    make_images(dm.paths["entrada"], 2)
+    accept(dm)
+    make_images(dm.paths["entrada"], 2)  # Same content again
+    shutil.copy(dm.paths["entrada"] / "img0.jpg", dm.paths["entrada"] / "copy.jpg")
+    make_images(dm.paths["entrada"], 1, prefix="new", seed=1)
+
+    assert dm.scan_entrada() == ["new0.jpg"]
+    assert [(d["filename"], d["reason"]) for d in dm.entrada_duplicates()] == [
+        ("copy.jpg", "index"), ("img0.jpg", "index"), ("img1.jpg", "index")]
+    assert dm.get_detailed_stats()["entrada_duplicates"] == 3
+
+    result = dm.remove_entrada_duplicates(["img1.jpg", "new0.jpg"])
+    assert result == {"removed": ["img1.jpg"], "errors": []}
+    dm.remove_entrada_duplicates()
+    assert sorted(os.listdir(dm.paths["entrada"])) == ["new0.jpg"]
+    assert dm.entrada_duplicates() == []
+
+
+def test_counters_follow_accepts_and_removals(dm):
+    dm.reconcile_counters()
+    make_images(dm.paths["entrada"], 3)
+    accept(dm)
+
+    assert dm.index.get_counters()["clasificaciones_real"] == 3
+
+    # Accepting new content under a name already in the dataset replaces the file
+    make_images(dm.paths["entrada"], 1, seed=1)
+    dm.process_batch([{"filename": "img0.jpg", "label": "real"}])
+    assert dm.index.get_counters()["clasificaciones_real"] == 3
+
+    (dm.paths["clasificaciones_real"] / "img1.jpg").unlink()
+    dm.dataset_file_removed("real", "img1.jpg")
+
+    assert dm.get_detailed_stats()["clasificaciones_real"] == 2
+    assert dm.reconcile_counters()["clasificaciones_real"] == 2
+
+
+def put_entries(dm, timestamps):
+    dm.paths["clasificaciones_real"].mkdir(parents=True, exist_ok=True)
+    entries = {}
+    for i, timestamp in enumerate(timestamps):
+        path = dm.paths["clasificaciones_real"] / f"s{i}.jpg"
+        path.write_bytes(b"x")
+        entries[f"h{i}"] = {"path": str(path), "label": "real", "origin": "clasificaciones",
+                            "timestamp": timestamp, "hash": f"h{i}"}
+    dm.index.put_many(entries)
+
+
+def drain(dm, limit):
+    """Sizes of the successive get_new_samples windows until nothing is left."""
+    watermark, sizes = 0.0, []
+    while dm.has_new_samples(watermark):
+        samples, watermark = dm.get_new_samples(watermark, limit=limit)
+        sizes.append(len(samples["real"]))
+    return sizes
+
+
+def test_new_samples_drain_oldest_first_without_splitting_ties(dm):
+    put_entries(dm, [1, 2, 3, 3, 3, 4, 5])
+
+    samples, watermark = dm.get_new_samples(0.0, limit=2)
+    assert sorted(os.path.basename(p) for p in samples["real"]) == ["s0.jpg", "s1.jpg"]
+    assert watermark == 2
+
+    assert drain(dm, limit=3) == [2, 3, 2]
+    assert drain(dm, limit=1) == [1, 1, 3, 1, 1]
+
+
+def test_new_samples_skip_entries_whose_file_is_gone(dm):
+    put_entries(dm, [1, 2])
+    (dm.paths["clasificaciones_real"] / "s0.jpg").unlink()
+    (dm.paths["clasificaciones_real"] / "s1.jpg").unlink()
+
+    samples, watermark = dm.get_new_samples(0.0, limit=10)
+
+    assert samples == {"real": [], "ia": []}
+    assert watermark == 2
+
+
+def test_entrada_page_cursor_survives_removals(dm):
+    make_images(dm.paths["entrada"], 5)
+
+    first = dm.entrada_page(limit=2)
+    assert first["files"] == ["img0.jpg", "img1.jpg"] and first["total"] == 5
+    dm.remove_entrada_file("img0.jpg")
+    dm.remove_entrada_file("img2.jpg")
+
+    second = dm.entrada_page(cursor=first["next_cursor"], limit=2)
+    assert second["files"] == ["img3.jpg", "img4.jpg"]
+    assert second["next_cursor"] is None
+    assert dm.entrada_page(sort="name", descending=True, limit=1)["files"] == ["img4.jpg"]
+    with pytest.raises(ValueError):
+        dm.entrada_page(sort="color")
+
+
+def test_entrada_files_are_checked_once(dm, monkeypatch):
+    make_images(dm.paths["entrada"], 3)
+    dm.scan_entrada()
+
+    calls = []
+    original = dm.find_duplicate
+    monkeypatch.setattr(dm, "find_duplicate", lambda *a, **k: calls.append(a[0]) or original(*a, **k))
+    dm.entrada_page(limit=2)
+    dm.scan_entrada()
+    assert calls == []
+
+    make_images(dm.paths["entrada"], 1, prefix="new", seed=1)
+    assert dm.scan_entrada()[-1] == "new0.jpg"
+    assert [p.name for p in calls] == ["new0.jpg"]
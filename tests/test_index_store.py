@@ -0,0 +1,69 @@
+"""Index backends: queries, counters and the one-time JSON -> SQLite migration."""
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "logic"))
+
+from index_store import IndexStore, JsonIndexStore, SqliteIndexStore, open_index_store  # noqa: E402
+
+
+def entry(file_hash, timestamp, label="real"):
+    return {"path": f"clasificaciones/{label}/{file_hash}.jpg", "label": label, "origin": "clasificaciones",
+            "timestamp": timestamp, "hash": file_hash}
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def store(request, tmp_path):
+    index = open_index_store(request.param, tmp_path / "index.json", tmp_path / "index.db")
+    yield index
+    index.close()
+
+
+def test_query_since_is_oldest_first(store):
+    store.put_many({h: entry(h, t) for h, t in (("c", 3.0), ("a", 1.0), ("b", 2.0), ("d", 4.0))})
+
+    assert [e["hash"] for e in store.query_since(1.0)] == ["b", "c", "d"]
+    assert [e["hash"] for e in store.query_since(0.0, limit=2)] == ["a", "b"]
+    assert "a" in store and "z" not in store
+    assert len(store) == 4
+
+
+def test_counters_start_only_once_set(store):
+    assert store.get_counters() is None
+    store.add_counters({"clasificaciones_real": 1})
+    assert store.get_counters() is None  # No wrong base to add to
+
+    store.set_counters({"clasificaciones_real": 5})
+    store.put_many({"a": entry("a", 1.0)}, counter_deltas={"clasificaciones_real": 2, "clasificaciones_ia": 1})
+
+    # Counters that were never set stay unset
+    assert store.get_counters() == {"clasificaciones_real": 7}
+    assert store.get("a")["label"] == "real"
+
+
+def test_sqlite_imports_the_json_index_once(tmp_path):
+    json_path = tmp_path / "index.json"
+    json_path.write_text(json.dumps({"a": entry("a", 1.0), "b": entry("b", 2.0, "ia")}))
+
+    store = SqliteIndexStore(str(tmp_path / "index.db"), legacy_json_path=str(json_path))
+    assert len(store) == 2 and store.count_by_label() == {"real": 1, "ia": 1}
+    store.close()
+
+    # Later edits to the JSON file are not imported again
+    json_path.write_text(json.dumps({"c": entry("c", 3.0)}))
+    store = SqliteIndexStore(str(tmp_path / "index.db"), legacy_json_path=str(json_path))
+    assert sorted(h for h, _ in store.items()) == ["a", "b"]
+    store.close()
+
+
+def test_incomplete_backend_fails_on_construction():
+    class Partial(IndexStore):
+        def get(self, file_hash):
+            return None
+
+    with pytest.raises(TypeError):
+        Partial()
+    assert JsonIndexStore.__abstractmethods__ == frozenset()
@@ -0,0 +1,109 @@
+"""Smoke test: one training epoch on a few synthetic images, full and head-only."""
+import os
+import sys
+
+import numpy as np
+import pytest
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "logic"))
+
+torch = pytest.importorskip("torch")
+
+from model_manager import ModelManager  # noqa: E402
+
+
+def make_dataset(folder, per_class=4):
+    rng = np.random.default_rng(0)
+    data = {}
+    for label in ("ia", "real"):
+        (folder / label).mkdir(parents=True)
+        data[label] = []
+        for i in range(per_class):
+            path = folder / label / f"{i}.jpg"
+            Image.fromarray(rng.integers(0, 256, (64, 64, 3), dtype=np.uint8)).save(path)
+            data[label].append(str(path))
+    return data
+
+
+@pytest.mark.parametrize("head_only", [False, True])
+def test_train_one_epoch_saves_checkpoint(tmp_path, head_only):
+    data = make_dataset(tmp_path / "data")
+    model_path = tmp_path / "modelo" / "modelo_actual.pth"
+    model_path.parent.mkdir()
+    mm = ModelManager(str(model_path),
+                      feature_cache_dir=str(tmp_path / "features") if head_only else None)
+
+    result = mm.train(data, epochs=1, trained_until=123.0)
+
+    assert set(result) >= {"accuracy", "loss"}
+    assert model_path.exists()
+    assert ModelManager(str(model_path)).trained_until == 123.0
+
+
+def test_failed_checkpoint_load_resets_trained_until(tmp_path):
+    model_path = tmp_path / "modelo_actual.pth"
+    torch.save({"state_dict": {"fc.weight": torch.zeros(1)}, "trained_until": 123.0}, model_path)
+
+    mm = ModelManager(str(model_path))
+
+    assert mm.trained_until == 0.0
+
+
+def test_watermark_advances_past_deleted_samples(tmp_path):
+    from data_manager import DataManager
+
+    dm = DataManager(str(tmp_path))
+    make_dataset(dm.paths["entrada"].parent / "tmp", per_class=2)
+    for label in ("ia", "real"):
+        for path in (dm.paths["entrada"].parent / "tmp" / label).iterdir():
+            os.replace(path, dm.paths["entrada"] / f"{label}_{path.name}")
+    items = [{"filename": name, "label": name.split("_")[0]} for name in dm.scan_entrada()]
+    dm.process_batch(items)
+    for label in ("ia", "real"):
+        for path in dm.paths[f"clasificaciones_{label}"].iterdir():
+            path.unlink()
+
+    model_path = tmp_path / "modelo" / "modelo_actual.pth"
+    model_path.parent.mkdir()
+    mm = ModelManager(str(model_path), hash_fn=dm.get_file_hash)
+    mm.save_model()
+
+    new_files, trained_until = dm.get_new_samples(mm.trained_until, limit=10)
+    assert new_files == {"ia": [], "real": []} and trained_until > 0
+    assert mm.train(dm.get_dataset_files(), epochs=1, new_files=new_files, trained_until=trained_until) == {}
+
+    assert mm.trained_until == trained_until
+    assert ModelManager(str(model_path)).trained_until == trained_until
+    assert dm.get_new_samples(trained_until, limit=10)[1] == trained_until
+
+
+def test_legacy_checkpoint_watermark_is_its_mtime(tmp_path):
+    model_path = tmp_path / "modelo_actual.pth"
+    torch.save(ModelManager._build_model().state_dict(), model_path)
+    os.utime(model_path, (1000.0, 1000.0))
+
+    assert ModelManager(str(model_path)).trained_until == 1000.0
+
+
+def test_scheduler_reruns_when_run_rearms():
+    import threading
+
+    from training_scheduler import TrainingScheduler
+
+    runs = []
+    done = threading.Event()
+
+    def run(progress_callback, full_retrain=False):
+        runs.append(full_retrain)
+        if len(runs) < 3:
+            scheduler.run_now()  # Backlog left
+        else:
+            done.set()
+        return {}
+
+    scheduler = TrainingScheduler(run, min_interval=0)
+    scheduler.run_now()
+    assert done.wait(10)
+    scheduler.stop()
+    assert len(runs) == 3
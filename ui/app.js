@@ -7,12 +7,16 @@ document.addEventListener('DOMContentLoaded', () => {
     loadImages();
     loadStats();
     setupConsole();
+    watchModelStatus();
     
     document.getElementById('refresh-btn').addEventListener('click', () => {
         loadImages();
         loadStats();
     });
 
+    document.getElementById('sort-select').addEventListener('change', () => loadImages());
+    document.getElementById('load-more-btn').addEventListener('click', () => loadMoreImages());
+
     document.getElementById('refresh-stats-btn').addEventListener('click', () => {
         loadStats();
         showToast('Estadísticas actualizadas');
@@ -40,15 +44,22 @@ function setupConsole() {
     const logsContainer = document.getElementById('console-logs');
     const autoScrollCheckbox = document.getElementById('auto-scroll');
     
+    const MAX_LOG_ENTRIES = 1000;
+    let logCursor = 0;      // Sequence number of the last line received
+    let logStream = null;
+    
     toggleBtn.addEventListener('click', () => {
         panel.classList.toggle('hidden');
         if (!panel.classList.contains('hidden')) {
-            fetchLogs();
+            openLogStream();
+        } else {
+            closeLogStream();
         }
     });
     
     closeBtn.addEventListener('click', () => {
         panel.classList.add('hidden');
+        closeLogStream();
     });
     
     // Copy logs to clipboard
@@ -66,35 +77,46 @@ function setupConsole() {
         }
     });
     
-    // Poll logs every 2 seconds
-    setInterval(fetchLogs, 2000);
+    // Only new lines are sent while the console is open (server-sent events)
+    function openLogStream() {
+        if (logStream) return;
+        
+        logStream = new EventSource(`${API_BASE}/logs/stream?since=${logCursor}`);
+        logStream.onmessage = (event) => {
+            logCursor = Number(event.lastEventId) || logCursor;
+            appendLog(JSON.parse(event.data));
+        };
+        logStream.onerror = (error) => {
+            // EventSource reconnects by itself, resuming after the last id
+            console.error('Error streaming logs:', error);
+        };
+    }
+    
+    function closeLogStream() {
+        if (logStream) {
+            logStream.close();
+            logStream = null;
+        }
+    }
     
-    async function fetchLogs() {
-        if (panel.classList.contains('hidden')) return;
+    function appendLog(log) {
+        const div = document.createElement('div');
+        div.className = 'log-entry';
         
-        try {
-            const response = await fetch(`${API_BASE}/logs`);
-            const logs = await response.json();
-            
-            // Clear and rebuild (simple approach, could be optimized)
-            logsContainer.innerHTML = '';
-            logs.forEach(log => {
-                const div = document.createElement('div');
-                div.className = 'log-entry';
-                
-                if (log.includes('[ERROR]')) div.classList.add('error');
-                else if (log.includes('[WARNING]')) div.classList.add('warning');
-                else div.classList.add('info');
-                
-                div.textContent = log;
-                logsContainer.appendChild(div);
-            });
-            
-            if (autoScrollCheckbox.checked) {
-                logsContainer.scrollTop = logsContainer.scrollHeight;
-            }
-        } catch (error) {
-            console.error('Error fetching logs:', error);
+        if (log.includes('[ERROR]')) div.classList.add('error');
+        else if (log.includes('[WARNING]')) div.classList.add('warning');
+        else div.classList.add('info');
+        
+        div.textContent = log;
+        logsContainer.appendChild(div);
+        
+        // Same limit as the server buffer
+        while (logsContainer.childElementCount > MAX_LOG_ENTRIES) {
+            logsContainer.firstElementChild.remove();
+        }
+        
+        if (autoScrollCheckbox.checked) {
+            logsContainer.scrollTop = logsContainer.scrollHeight;
         }
     }
 }
@@ -124,7 +146,12 @@ function setupUpload() {
             const data = await response.json();
             
             if (response.ok) {
-                showToast(`Carga completada: ${data.files.length} archivos`);
+                let message = `Carga completada: ${data.files.length} archivos`;
+                if (data.duplicates && data.duplicates.length > 0) {
+                    console.info("Duplicates skipped:", data.duplicates);
+                    message += `, ${data.duplicates.length} duplicadas descartadas`;
+                }
+                showToast(message);
                 if (data.errors && data.errors.length > 0) {
                     console.error("Upload errors:", data.errors);
                     showToast(`Hubo ${data.errors.length} errores (ver consola)`);
@@ -213,6 +240,14 @@ function setupAccept() {
     });
 }
 
+// The queue is loaded one page at a time; each page is classified by a background
+// job on the server and its results are shown as they arrive
+const IMAGES_PAGE_SIZE = 60;
+let imagesCursor = null;
+let imagesTotal = 0;
+let imagesLoaded = 0;
+let imagesJob = null;   // { id, stream } of the page being classified
+
 async function loadImages() {
     const listIA = document.getElementById('list-ia');
     const listReal = document.getElementById('list-real');
@@ -220,34 +255,82 @@ async function loadImages() {
     listIA.innerHTML = '<div class="loading">Cargando...</div>';
     listReal.innerHTML = '<div class="loading">Cargando...</div>';
     
+    cancelImagesJob();
+    imagesCursor = null;
+    imagesLoaded = 0;
+    await loadMoreImages(true);
+}
+
+function cancelImagesJob() {
+    if (!imagesJob) return;
+    imagesJob.stream.close();
+    fetch(`${API_BASE}/jobs/${imagesJob.id}/cancel`, { method: 'POST' }).catch(() => {});
+    imagesJob = null;
+}
+
+async function loadMoreImages(reset = false) {
+    if (imagesJob) return;
+    
+    const listIA = document.getElementById('list-ia');
+    const listReal = document.getElementById('list-real');
+    const loadMoreBtn = document.getElementById('load-more-btn');
+    const [sort, order] = document.getElementById('sort-select').value.split(':');
+    
     try {
-        const response = await fetch(`${API_BASE}/images`);
-        const images = await response.json();
+        const body = { limit: IMAGES_PAGE_SIZE, sort, order };
+        if (imagesCursor) body.cursor = imagesCursor;
+        
+        const response = await fetch(`${API_BASE}/jobs/classify`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify(body)
+        });
+        const job = await response.json();
+        if (!response.ok) throw new Error(job.error);
         
-        listIA.innerHTML = '';
-        listReal.innerHTML = '';
+        if (reset) {
+            listIA.innerHTML = '';
+            listReal.innerHTML = '';
+        }
         
-        let countIA = 0;
-        let countReal = 0;
+        imagesCursor = job.next_cursor;
+        imagesTotal = job.queue_total;
+        loadMoreBtn.classList.add('hidden');
         
-        images.forEach(img => {
+        const stream = new EventSource(`${API_BASE}/jobs/${job.job_id}/stream`);
+        imagesJob = { id: job.job_id, stream };
+        
+        stream.onmessage = (event) => {
+            const img = JSON.parse(event.data);
             const el = createImageElement(img);
             if (img.prediction.label === 'ia') {
                 listIA.appendChild(el);
-                countIA++;
             } else {
                 listReal.appendChild(el);
-                countReal++;
             }
+            imagesLoaded++;
+            updateCounts();
+        };
+        stream.onerror = () => {
+            // Reconnects resume after the last result; a closed stream means the job is gone
+            if (stream.readyState === EventSource.CLOSED) {
+                imagesJob = null;
+                loadMoreBtn.classList.toggle('hidden', !imagesCursor);
+            }
+        };
+        stream.addEventListener('end', () => {
+            stream.close();
+            imagesJob = null;
+            loadMoreBtn.classList.toggle('hidden', !imagesCursor);
+            loadMoreBtn.textContent = `Cargar más (${imagesTotal - imagesLoaded})`;
         });
         
-        document.getElementById('count-ia').textContent = countIA;
-        document.getElementById('count-real').textContent = countReal;
-        
     } catch (error) {
         console.error('Error loading images:', error);
-        listIA.innerHTML = 'Error';
-        listReal.innerHTML = 'Error';
+        if (reset) {
+            listIA.innerHTML = 'Error';
+            listReal.innerHTML = 'Error';
+        }
     }
 }
 
@@ -258,10 +341,11 @@ function createImageElement(imgData) {
     div.dataset.filename = imgData.filename;
     div.ondragstart = drag;
     
-    const confidence = imgData.prediction === "Error" ? "Err" : (imgData.prediction.confidence * 100).toFixed(0) + "%";
+    const isError = imgData.prediction === "Error" || imgData.prediction.label === "error";
+    const confidence = isError ? "Err" : (imgData.prediction.confidence * 100).toFixed(0) + "%";
     
     div.innerHTML = `
-        <img src="${imgData.url}" alt="${imgData.filename}" draggable="false">
+        <img src="${imgData.thumbnail || imgData.url}" alt="${imgData.filename}" draggable="false" loading="lazy">
         <div class="conf-tag">${confidence}</div>
         <div class="image-info" title="${imgData.filename}">${imgData.filename}</div>
         <button class="remove-btn" title="Eliminar de la cola" onclick="removeImage('${imgData.filename}')">×</button>
@@ -343,6 +427,28 @@ function updateCounts() {
     document.getElementById('count-real').textContent = document.getElementById('list-real').children.length;
 }
 
+// The model loads in the background after the window opens
+async function watchModelStatus() {
+    const indicator = document.getElementById('status-indicator');
+    const labels = {
+        loading: 'Cargando modelo...',
+        ready: 'Sistema Listo',
+        error: 'Error cargando modelo'
+    };
+    
+    try {
+        const response = await fetch(`${API_BASE}/status`);
+        const status = await response.json();
+        indicator.innerHTML = `<span class="dot ${status.model_state}"></span> ${labels[status.model_state]}`;
+        if (status.model_state === 'loading') {
+            setTimeout(watchModelStatus, 1000);
+        }
+    } catch (error) {
+        console.error('Error fetching status:', error);
+        setTimeout(watchModelStatus, 2000);
+    }
+}
+
 function showToast(message) {
     const toast = document.getElementById('toast');
     toast.textContent = message;